@@ -1,25 +1,74 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from agents.base_agent import BaseAgent
+from message_bus import MessageBus
+from llm.budget import CallBudget
+from services import Services, services as default_services
+from tools.workspace import Workspace
+from tracing import span
+import time
 
 class AgentManager:
-    def __init__(self):
+    def __init__(self, max_llm_calls: Optional[int] = None, services: Optional[Services] = None):
         self.agents: Dict[str, BaseAgent] = {}
+        self.services = services or default_services
+        self.workspace = Workspace()
+        self.bus = MessageBus()
+        self.llm_budget = CallBudget(max_llm_calls)
 
     def add_agent(self, agent: BaseAgent):
         self.agents[agent.name] = agent
         agent.set_manager(self)
+        agent.workspace = self.workspace
+        agent.attach_services(self.services)
+        self.bus.register(agent.name, agent.max_concurrency)
+        if getattr(agent, "llm", None) is not None:
+            agent.llm.budget = self.llm_budget
         print(f"[AgentManager] '{agent.name}' registered.")
 
     def send_message(self, recipient: str, message: Dict[str, Any], sender: str):
         if recipient in self.agents:
             print(f"[AgentManager] Routing message from '{sender}' to '{recipient}'.")
-            self.agents[recipient].receive_message(sender, message)
+            agent = self.agents[recipient]
+            posted_at = time.perf_counter()
+
+            def deliver():
+                queued_ms = round((time.perf_counter() - posted_at) * 1000, 1)
+                with span(f"{recipient}:{message.get('type', 'message')}", "message", sender=sender, recipient=recipient, task_id=message.get("task_id"), queued_ms=queued_ms):
+                    agent.receive_message(sender, message)
+
+            self.bus.post(recipient, deliver)
         else:
             print(f"[AgentManager] Error: Recipient '{recipient}' not found.")
 
     def start_task(self, initial_goal: str, start_agent_name: str):
         if start_agent_name in self.agents:
             initial_task = {"goal": initial_goal}
-            self.agents[start_agent_name].execute_task(initial_task)
+            agent = self.agents[start_agent_name]
+
+            def deliver():
+                with span(f"{start_agent_name}:goal", "message", sender="AgentManager", recipient=start_agent_name):
+                    agent.execute_task(initial_task)
+
+            self.bus.post(start_agent_name, deliver)
+            self.run_until_idle()
         else:
             print(f"[AgentManager] Error: Start agent '{start_agent_name}' not found.")
+
+    def resume_task(self, agent_name: str):
+        if agent_name in self.agents:
+            agent = self.agents[agent_name]
+
+            def deliver():
+                with span(f"{agent_name}:resume", "message", sender="AgentManager", recipient=agent_name):
+                    print(f"[AgentManager] {agent.resume()}")
+
+            self.bus.post(agent_name, deliver)
+            self.run_until_idle()
+        else:
+            print(f"[AgentManager] Error: Agent '{agent_name}' not found.")
+
+    def run_until_idle(self):
+        self.bus.run_until_idle()
+        written = self.workspace.flush()
+        if written:
+            print(f"[AgentManager] Flushed {len(written)} file(s) to disk.")
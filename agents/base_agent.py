@@ -1,18 +1,30 @@
 from __future__ import annotations
 from typing import TYPE_CHECKING, Dict, Any
+from agents.context import preview
 
 if TYPE_CHECKING:
     from agent_manager import AgentManager
+    from services import Services
+    from tools.workspace import Workspace
 
 class BaseAgent:
+    # How many messages this agent may handle at once. Stateful agents keep 1.
+    max_concurrency: int = 1
+
     def __init__(self, name: str, role: str):
         self.name = name
         self.role = role
         self.manager: AgentManager = None
+        # The run's file overlay, set by AgentManager.add_agent.
+        self.workspace: Workspace = None
 
     def set_manager(self, manager: AgentManager):
         self.manager = manager
 
+    def attach_services(self, services: Services):
+        # Called by AgentManager.add_agent; agents take the shared clients they need from here.
+        pass
+
     def execute_task(self, task: Dict[str, Any]) -> str:
         raise NotImplementedError
 
@@ -23,5 +35,5 @@ class BaseAgent:
             print(f"[{self.name}] cannot send message: manager not set.")
 
     def receive_message(self, sender: str, message: Dict[str, Any]):
-        print(f"[{self.name}] received message from [{sender}]: {message}")
+        print(f"[{self.name}] received message from [{sender}]: {preview(message)}")
         self.execute_task(message)
@@ -1,16 +1,28 @@
 from agents.base_agent import BaseAgent
-from typing import Dict, Any
-import json
-from llm.openai_llm import OpenAILLM
-from tools.file_tools import read_file, write_to_file
-from tools.brave_search import BraveSearch
-import os
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+from agents.prompts import generation_messages, revision_messages, patch_messages
+from tools.data_emitter import describe_records, iter_records, render_records
+from tools.response_normalizers import compact_json
+from tools.search_policy import SearchPolicy, SearchPrefetcher
+from tools.patch_tools import PatchError, parse_search_replace_blocks, apply_search_replace
 
 class CoderAgent(BaseAgent):
-    def __init__(self, name: str = "Coder", role: str = "Code Generation Specialist"):
+    max_concurrency = 4
+
+    def __init__(self, name: str = "Coder", role: str = "Code Generation Specialist", stream: bool = True, revision_mode: str = "patch"):
         super().__init__(name, role)
-        self.llm = OpenAILLM()
-        self.search_tool = BraveSearch()
+        self.llm = None
+        self.search_tool = None
+        self.prefetcher = None
+        self.search_policy = SearchPolicy()
+        self.stream = stream
+        # "patch" asks for SEARCH/REPLACE edits and falls back to a full rewrite; "full" always rewrites.
+        self.revision_mode = revision_mode
+
+    def attach_services(self, services):
+        self.llm = services.llm("coder")
+        self.search_tool = services.search
+        self.prefetcher = SearchPrefetcher(self.search_tool)
 
     def _strip_markdown(self, code: str) -> str:
         lines = code.strip().split('\n')
@@ -21,10 +33,49 @@ class CoderAgent(BaseAgent):
             
         return "\n".join(lines).strip()
 
+    def _strip_markdown_stream(self, chunks: Iterable[str]) -> Iterator[str]:
+        # Streaming version of _strip_markdown: the first line is held until we know whether it is
+        # a fence, and the last non-blank line is held back in case it is the closing fence.
+        head = ""
+        started = False
+        emitted = False
+        pending = ""
+        for chunk in chunks:
+            if not started:
+                head = (head + chunk).lstrip()
+                if "\n" not in head:
+                    continue
+                first_line, rest = head.split("\n", 1)
+                started = True
+                pending = rest if first_line.strip().startswith("```") else head
+            else:
+                pending += chunk
+            if not emitted:
+                pending = pending.lstrip()
+            last_line_start = pending.rstrip().rfind("\n") + 1
+            safe_end = len(pending[:last_line_start].rstrip())
+            if safe_end:
+                yield pending[:safe_end]
+                pending = pending[safe_end:]
+                emitted = True
+
+        if not started:
+            pending = "" if head.strip().startswith("```") else head
+        tail = pending.rstrip()
+        last_line_start = tail.rfind("\n") + 1
+        if tail[last_line_start:].strip() == "```":
+            tail = tail[:last_line_start].rstrip()
+        if not emitted:
+            tail = tail.lstrip()
+        if tail:
+            yield tail
+
     def execute_task(self, task: Dict[str, Any]) -> str:
         print(f"[{self.name}] received task: {task.get('description')}")
         if task.get("type") == "coding_task":
             return self._handle_coding_task(task)
+        elif task.get("type") == "data_task":
+            return self._handle_data_task(task)
         elif task.get("type") == "evaluation_result" and task.get("status") == "requires_revision":
             return self._handle_revision_request(task)
         
@@ -40,19 +91,39 @@ class CoderAgent(BaseAgent):
         print(f"[{self.name}] starting to code for: {description}")
         
         current_code = ""
-        if os.path.exists(file_path):
-            current_code = read_file(file_path)
-
-        generated_code = self._generate_code(description, current_code, api_data)
-        cleaned_code = self._strip_markdown(generated_code)
-        
-        write_to_file(file_path, cleaned_code)
+        if self.workspace.exists(file_path):
+            current_code = self.workspace.read(file_path)
+
+        messages = self._generation_messages(description, current_code, api_data, file_path)
+        result = self._write_code(file_path, messages)
+        if result.startswith("Error"):
+            self._notify_failed(task, result)
+            return result
         
         print(f"[{self.name}] finished coding. Notifying Planner.")
-        self.send_message("Planner", {"type": "task_complete"})
+        self._notify_complete(task)
         
         return f"Code generated for {file_path}."
 
+    def _handle_data_task(self, task: Dict[str, Any]) -> str:
+        # Data files are rendered from the API records directly; no LLM call is made.
+        file_path = task.get("file_path")
+        if not file_path:
+            return "Error: 'file_path' is required for data tasks."
+        records = list(iter_records(task.get("records") or []))
+        if not records:
+            print(f"[{self.name}] No API records for {file_path}; writing an empty data file.")
+        variable = task.get("variable") or "papers"
+        fields = task.get("fields") or None
+        chunks = render_records(records, file_path, variable, fields)
+        result = self.workspace.write_stream(file_path, self._report_progress(file_path, chunks))
+        print(f"[{self.name}] {result} ({len(records)} records)")
+        if result.startswith("Error"):
+            self._notify_failed(task, result)
+            return result
+        self._notify_complete(task, data_schema=describe_records(records, file_path, variable, fields))
+        return f"Data file generated for {file_path}."
+
     def _handle_revision_request(self, task: Dict[str, Any]) -> str:
         file_path = task.get("file_path")
         feedback = task.get("feedback")
@@ -62,69 +133,95 @@ class CoderAgent(BaseAgent):
 
         print(f"[{self.name}] received revision request: {feedback}")
 
-        current_code = read_file(file_path)
-        
-        revised_code = self._revise_code(feedback, current_code)
-        cleaned_code = self._strip_markdown(revised_code)
-        write_to_file(file_path, cleaned_code)
+        current_code = self.workspace.read(file_path)
+
+        if not (self.revision_mode == "patch" and self.workspace.exists(file_path) and self._patch_code(file_path, feedback, current_code)):
+            messages = self._revision_messages(feedback, current_code, file_path)
+            result = self._write_code(file_path, messages, task_type="revise")
+            if result.startswith("Error"):
+                self._notify_failed(task, result)
+                return result
 
         print(f"[{self.name}] finished revision. Notifying Planner.")
-        self.send_message("Planner", {"type": "task_complete"})
+        self._notify_complete(task)
 
         return f"Code revised for {file_path}."
 
-    def _generate_code(self, description: str, current_code: str = "", api_data: Any = None) -> str:
-        search_results = self.search_tool.search(description)
-        
-        api_context = ""
+    def _notify_complete(self, task: Dict[str, Any], **extra: Any):
+        file_path = task.get("file_path")
+        file_hash = self.workspace.hash(file_path) if file_path else None
+        self.send_message("Planner", {"type": "task_complete", "task_id": task.get("task_id"), "content_hash": file_hash, **extra})
+
+    def _notify_failed(self, task: Dict[str, Any], error: str):
+        # The Planner keeps the task for --resume instead of counting it as done.
+        self.send_message("Planner", {"type": "task_failed", "task_id": task.get("task_id"), "error": error})
+
+    def _write_code(self, file_path: str, messages: List[Dict[str, str]], task_type: str = "generate") -> str:
+        if not self.stream:
+            generated_code = self.llm.generate_completion(messages, temperature=0.1, task_type=task_type)
+            if generated_code is None:
+                print(f"[{self.name}] LLM call failed; leaving {file_path} unchanged.")
+                return f"Error: LLM call failed for '{file_path}'."
+            return self.workspace.write(file_path, self._strip_markdown(generated_code))
+
+        chunks = self._strip_markdown_stream(self.llm.stream_completion(messages, temperature=0.1, task_type=task_type))
+        result = self.workspace.write_stream(file_path, self._report_progress(file_path, chunks))
+        print(f"[{self.name}] {result}")
+        return result
+
+    def _report_progress(self, file_path: str, chunks: Iterable[str], every: int = 2048) -> Iterator[str]:
+        written = 0
+        reported = 0
+        for chunk in chunks:
+            written += len(chunk)
+            if written - reported >= every:
+                print(f"[{self.name}] streamed {written} chars to {file_path}...")
+                reported = written
+            yield chunk
+
+    def _search_context(self, kind: str, file_path: str, query: str, api_data: Any = None) -> Optional[str]:
+        if not self.search_policy.should_search(kind, file_path, query, api_data):
+            print(f"[{self.name}] skipping web search for {file_path}.")
+            return None
+        return self.prefetcher.get(query)
+
+    def _prefetch_searches(self, tasks: List[Dict[str, Any]]):
+        for task in tasks:
+            description = task.get("description")
+            if self.search_policy.should_search("generate", task.get("file_path"), description, task.get("api_data")):
+                self.prefetcher.prefetch(description)
+
+    def _generation_messages(self, description: str, current_code: str = "", api_data: Any = None, file_path: str = "") -> List[Dict[str, str]]:
+        search_results = self._search_context("generate", file_path, description, api_data)
+        data_str = None
         if api_data:
-            if isinstance(api_data, list):
-                data_str = json.dumps(api_data, indent=2)
-            else:
-                data_str = str(api_data)
-
-            api_context = f"""
-**API Data:**
-Here is the data returned from a recent API call. Use this data in the code you generate. If it is a list, you may need to process or merge the items.
-```json
-{data_str}
-```
-"""
-
-        system_prompt = f"""
-You are an expert programmer. Your task is to write clean, efficient, and correct code based on a given description.
-You will be given a description of the task, the current content of the file, and some search results for context.
-{api_context}
-Your output MUST be ONLY the complete, updated code for the file. Do NOT include any explanations, markdown, or any text other than the code itself.
-
-**Search Results:**
-{search_results}
-"""
-        user_message = f"**Task Description:**\n{description}\n\n**Current Code:**\n```\n{current_code}\n```\n\nPlease provide the complete, updated code for the file."
-        
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_message}
-        ]
-        
-        return self.llm.generate_completion(messages, temperature=0.1)
-
-    def _revise_code(self, feedback: str, current_code: str) -> str:
-        search_results = self.search_tool.search(feedback)
-
-        system_prompt = f"""
-You are an expert programmer. Your task is to revise a piece of code based on specific feedback.
-You will be given the feedback, the current code, and some search results for context.
-Your output MUST be ONLY the complete, updated code for the file. Do NOT include any explanations, markdown, or any text other than the code itself.
-
-**Search Results:**
-{search_results}
-"""
-        user_message = f"**Revision Feedback:**\n{feedback}\n\n**Current Code:**\n```\n{current_code}\n```\n\nPlease provide the complete, revised code for the file."
-        
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_message}
-        ]
-        
-        return self.llm.generate_completion(messages, temperature=0.1)
+            data_str = compact_json(api_data) if isinstance(api_data, list) else str(api_data)
+        return generation_messages(description, current_code, data_str, search_results)
+
+    def _patch_code(self, file_path: str, feedback: str, current_code: str) -> bool:
+        response = self.llm.generate_completion(self._patch_messages(feedback, current_code, file_path), temperature=0.1, task_type="patch")
+        if response is None:
+            print(f"[{self.name}] LLM call failed while patching {file_path}; falling back to a full rewrite.")
+            return False
+        try:
+            patched_code = apply_search_replace(current_code, parse_search_replace_blocks(response))
+        except PatchError as e:
+            print(f"[{self.name}] Patch for {file_path} did not apply ({e}); falling back to a full rewrite.")
+            return False
+        if not patched_code.strip() or patched_code == current_code:
+            print(f"[{self.name}] Patch for {file_path} changed nothing; falling back to a full rewrite.")
+            return False
+        print(f"[{self.name}] {self.workspace.write(file_path, patched_code)} (patched)")
+        return True
+
+    def _patch_messages(self, feedback: str, current_code: str, file_path: str = "") -> List[Dict[str, str]]:
+        return patch_messages(feedback, current_code, self._search_context("revision", file_path, feedback))
+
+    def _revision_messages(self, feedback: str, current_code: str, file_path: str = "") -> List[Dict[str, str]]:
+        return revision_messages(feedback, current_code, self._search_context("revision", file_path, feedback))
+
+    def receive_message(self, sender: str, message: Dict[str, Any]):
+        if message.get("type") == "search_prefetch":
+            self._prefetch_searches(message.get("tasks", []))
+        else:
+            super().receive_message(sender, message)
@@ -0,0 +1,118 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from llm.tokens import count_tokens
+from tools.response_normalizers import compact_json
+
+# Token budgets for the prompt sections that grow with the length of a run. Newest entries are kept
+# verbatim, older ones are rolled up, so the size of each call stays about the same however long the run is.
+SEARCH_HISTORY_TOKENS = 1500
+EVALUATION_HISTORY_TOKENS = 2000
+FINDINGS_TOKENS = 1500
+ENTRY_TOKENS = 400
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if count_tokens(text) <= max_tokens:
+        return text
+    marker = " ...[truncated]"
+    budget = max(0, max_tokens - count_tokens(marker))
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(text[:middle]) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low].rstrip() + marker
+
+def _shorten(value: Any, max_tokens: int) -> Any:
+    # The same structure with every string cut to max_tokens.
+    if isinstance(value, str):
+        return truncate_to_tokens(value, max_tokens)
+    if isinstance(value, list):
+        return [_shorten(item, max_tokens) for item in value]
+    if isinstance(value, dict):
+        return {key: _shorten(item, max_tokens) for key, item in value.items()}
+    return value
+
+def fit_json(value: Any, max_tokens: int, drop: Sequence[Tuple[str, str]] = ()) -> str:
+    # Serializes value within max_tokens by trimming the structure rather than the JSON text, so the prompt
+    # always holds valid JSON. Each (list key, counter key) in `drop` loses its oldest items first, counted
+    # under the counter key; then strings are shortened, and a top-level list loses its last items.
+    if isinstance(value, dict):
+        value = {key: list(item) if isinstance(item, list) else item for key, item in value.items()}
+    elif isinstance(value, list):
+        value = list(value)
+    text = compact_json(value)
+    for key, counter in drop:
+        while count_tokens(text) > max_tokens and value.get(key):
+            value[key].pop(0)
+            value[counter] = value.get(counter, 0) + 1
+            text = compact_json(value)
+    limit = ENTRY_TOKENS
+    while count_tokens(text) > max_tokens and limit >= 16:
+        value = _shorten(value, limit)
+        text = compact_json(value)
+        limit //= 2
+    while count_tokens(text) > max_tokens and isinstance(value, list) and len(value) > 1:
+        value.pop()
+        text = compact_json(value)
+    return text
+
+def _newest_within(entries: List[Any], max_tokens: int) -> List[Any]:
+    # Walks back from the newest entry and keeps as many as fit, returned oldest first.
+    kept, used = [], 0
+    for entry in reversed(entries):
+        cost = count_tokens(compact_json(entry))
+        if used + cost > max_tokens:
+            break
+        kept.append(entry)
+        used += cost
+    return kept[::-1]
+
+def search_history_context(history: List[Any], max_tokens: int = SEARCH_HISTORY_TOKENS) -> Optional[str]:
+    if not history:
+        return None
+    entries = [truncate_to_tokens(entry if isinstance(entry, str) else compact_json(entry), ENTRY_TOKENS) for entry in history]
+    recent = _newest_within(entries, max_tokens * 3 // 4)
+    older = entries[:len(entries) - len(recent)]
+    context: Dict[str, Any] = {"recent": recent}
+    if older:
+        # Older results shrink to a one-line excerpt each, newest first, until the rest of the budget is used.
+        excerpts = _newest_within([truncate_to_tokens(entry, 40) for entry in older], max_tokens - count_tokens(compact_json(context)))
+        context["earlier_excerpts"] = excerpts
+        if len(excerpts) < len(older):
+            context["omitted"] = len(older) - len(excerpts)
+    return fit_json(context, max_tokens, drop=[("earlier_excerpts", "omitted"), ("recent", "omitted")])
+
+def evaluation_history_context(history: List[Dict[str, Any]], max_tokens: int = EVALUATION_HISTORY_TOKENS) -> str:
+    # Every file keeps its final verdict and revision count; only the newest entries keep their full feedback.
+    files: Dict[str, Dict[str, Any]] = {}
+    for entry in history:
+        path = entry.get("file_path") or "(none)"
+        rollup = files.setdefault(path, {"file": path, "evaluations": 0, "revisions_requested": 0})
+        rollup["evaluations"] += 1
+        rollup["final_status"] = entry.get("status")
+        if entry.get("status") == "requires_revision":
+            rollup["revisions_requested"] += 1
+    context: Dict[str, Any] = {"files": list(files.values())}
+    entries = [
+        {
+            "task_id": entry.get("task_id"),
+            "file_path": entry.get("file_path"),
+            "status": entry.get("status"),
+            "feedback": truncate_to_tokens(str(entry.get("feedback", "")), ENTRY_TOKENS // 2),
+        }
+        for entry in history
+    ]
+    recent = _newest_within(entries, max_tokens - count_tokens(compact_json(context)))
+    context["recent"] = recent
+    if len(recent) < len(entries):
+        context["omitted"] = len(entries) - len(recent)
+    return fit_json(context, max_tokens, drop=[("recent", "omitted"), ("files", "files_omitted")])
+
+def preview(value: Any, max_chars: int = 300) -> str:
+    # Short form of a message for logs; api_data and file contents can be tens of kilobytes.
+    try:
+        text = value if isinstance(value, str) else compact_json(value)
+    except (TypeError, ValueError):
+        text = str(value)
+    return text if len(text) <= max_chars else f"{text[:max_chars]}... ({len(text)} chars)"
@@ -1,13 +1,24 @@
 from agents.base_agent import BaseAgent
-from typing import Dict, Any
-from llm.openai_llm import OpenAILLM
+from typing import Dict, Any, List
+from agents.prompts import evaluation_messages, change_evaluation_messages
+import difflib
 import json
-from tools.file_tools import read_file
+import threading
+from tools.file_tools import content_hash
+from tools.static_checks import run_static_checks
 
 class EvaluatorAgent(BaseAgent):
+    max_concurrency = 4
+
     def __init__(self, name: str = "Evaluator", role: str = "Code Quality & Correctness Inspector"):
         super().__init__(name, role)
-        self.llm = OpenAILLM()
+        self.llm = None
+        # Per-file memory of the last evaluation: content, content hash, verdict and feedback.
+        self.file_states: Dict[str, Dict[str, Any]] = {}
+        self._state_lock = threading.Lock()
+
+    def attach_services(self, services):
+        self.llm = services.llm("evaluator")
 
     def execute_task(self, task: Dict[str, Any]) -> str:
         if not self.llm:
@@ -22,54 +33,73 @@ class EvaluatorAgent(BaseAgent):
 
         print(f"[{self.name}] received evaluation request for '{file_path}' from '{requester}'.")
 
-        code_to_evaluate = read_file(file_path)
+        code_to_evaluate = self.workspace.read(file_path)
         if code_to_evaluate.startswith("Error:"):
-            self.send_message(requester, {"type": "evaluation_result", "status": "error", "feedback": code_to_evaluate, "file_path": file_path})
+            self.send_message(requester, {"type": "evaluation_result", "status": "error", "feedback": code_to_evaluate, "file_path": file_path, "task_id": task.get("task_id")})
             return code_to_evaluate
 
-        evaluation_result = self._evaluate_code(goal, code_to_evaluate, file_path)
+        file_hash = content_hash(code_to_evaluate)
+        with self._state_lock:
+            state = self.file_states.get(file_path)
+        if state and state["goal"] != goal:
+            state = None
+
+        if state and state["content_hash"] == file_hash and state["status"] == "approved":
+            print(f"[{self.name}] '{file_path}' is unchanged since it was approved; skipping evaluation.")
+            evaluation_result = {"type": "evaluation_result", "status": "approved", "feedback": state["feedback"], "file_path": file_path}
+        else:
+            evaluation_result = self._check_and_evaluate(goal, code_to_evaluate, file_path, state)
+        evaluation_result["task_id"] = task.get("task_id")
+        evaluation_result["content_hash"] = file_hash
+
+        # Only LLM verdicts are remembered, so later diffs are always against a version the LLM has seen.
+        if evaluation_result.get("status") in ("approved", "requires_revision") and evaluation_result.get("checked_by") != "static_checks":
+            with self._state_lock:
+                self.file_states[file_path] = {
+                    "goal": goal,
+                    "content": code_to_evaluate,
+                    "content_hash": file_hash,
+                    "status": evaluation_result["status"],
+                    "feedback": evaluation_result.get("feedback", ""),
+                }
         
         # Send the evaluation back to the requester
         self.send_message(requester, evaluation_result)
         
         return f"Evaluation complete for '{file_path}'. Results sent to '{requester}'."
 
+    def _check_and_evaluate(self, goal: str, code: str, file_path: str, state: Dict[str, Any] = None) -> Dict[str, Any]:
+        problems = run_static_checks(file_path, code)
+        if problems:
+            # Trivial failures are reported straight away; the LLM only reviews files that pass.
+            print(f"[{self.name}] static checks failed for '{file_path}': {problems}")
+            return {
+                "type": "evaluation_result",
+                "status": "requires_revision",
+                "feedback": "Static checks found these problems:\n" + "\n".join(f"- {problem}" for problem in problems),
+                "file_path": file_path,
+                "checked_by": "static_checks",
+            }
+        if state and state["status"] == "requires_revision":
+            diff = "".join(difflib.unified_diff(
+                state["content"].splitlines(keepends=True),
+                code.splitlines(keepends=True),
+                fromfile="previous",
+                tofile="current",
+            ))
+            # A near-complete rewrite is cheaper to review as a whole file.
+            if diff and len(diff) < len(code) * 0.8:
+                return self._evaluate_changes(goal, diff, state["feedback"], file_path)
+        return self._evaluate_code(goal, code, file_path)
+
     def _evaluate_code(self, goal: str, code: str, file_path: str) -> Dict[str, Any]:
-        system_prompt = """
-You are an expert code evaluator. Your task is to assess a given piece of code based on a user's goal.
-Your evaluation MUST be in a JSON format. The JSON object must have two keys:
-1.  "status": (string) Either "approved" or "requires_revision".
-2.  "feedback": (string) If the status is "approved", provide a brief confirmation message. If "requires_revision", provide clear, specific, and constructive feedback on what needs to be changed to meet the goal.
-
-Evaluation criteria:
-- Readability: Is the code reader friendly?
-- Adherence: Does the code follow the specific requirements mentioned in the goal?
-
-Example 1 (Approved):
-Goal: "Create a Python function that adds two numbers."
-Code: "def add(a, b): return a + b"
-Your JSON Output:
-{
-    "status": "approved",
-    "feedback": "The code correctly implements the function to add two numbers."
-}
-
-Example 2 (Requires Revision):
-Goal: "Create a Python function that adds two numbers."
-Code: "def add(a, b): return a * b"
-Your JSON Output:
-{
-    "status": "requires_revision",
-    "feedback": "The code incorrectly multiplies the numbers instead of adding them. Please change the operator from '*' to '+'."
-}
-"""
-        user_message = f"Please evaluate the following code based on the user's goal.\n\n**Goal:** {goal}\n\n**Code:**\n```\n{code}\n```"
-        
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_message}
-        ]
-        
+        return self._request_verdict(evaluation_messages(goal, code), file_path)
+
+    def _evaluate_changes(self, goal: str, diff: str, outstanding_feedback: str, file_path: str) -> Dict[str, Any]:
+        print(f"[{self.name}] re-evaluating only the changes to '{file_path}'.")
+        return self._request_verdict(change_evaluation_messages(goal, diff, outstanding_feedback), file_path)
+
+    def _request_verdict(self, messages: List[Dict[str, str]], file_path: str) -> Dict[str, Any]:
         try:
             response_str = self.llm.generate_completion(
                 messages,
@@ -77,6 +107,8 @@ Your JSON Output:
                 response_format={"type": "json_object"}
             )
             print(f"[{self.name}] Raw LLM Evaluation Response:\n{response_str}\n")
+            if response_str is None:
+                return {"type": "evaluation_result", "status": "error", "feedback": "The LLM call failed.", "file_path": file_path}
             evaluation = json.loads(response_str)
             evaluation["type"] = "evaluation_result" 
             evaluation["file_path"] = file_path
@@ -1,18 +1,44 @@
 from agents.base_agent import BaseAgent
-from typing import Dict, Any
-from llm.openai_llm import OpenAILLM
+from typing import Dict, Any, List, Set
+from agents.prompts import planner_messages, plan_edit_messages, summary_messages
+from tools.checkpoint import save_checkpoint, load_checkpoint, int_keys
 import json
+import os
 
 class PlannerAgent(BaseAgent):
-    def __init__(self, name: str = "Planner", role: str = "Task Decomposition and Orchestration Specialist"):
+    def __init__(self, name: str = "Planner", role: str = "Task Decomposition and Orchestration Specialist", max_parallel_tasks: int = 4, max_revisions_per_task: int = 3, checkpoint_path: str = None, output_dir: str = None):
         super().__init__(name, role)
-        self.llm = OpenAILLM()
+        self.llm = None
         self.plan = []
         self.goal = ""
         self.search_history = []
         self.last_api_result = None
         self.current_task_id = -1
         self.evaluation_history = []
+        self.max_parallel_tasks = max(1, max_parallel_tasks)
+        self.running: Dict[int, Dict[str, Any]] = {}
+        self.completed = set()
+        # Completed tasks as of the last workspace flush (see _save_checkpoint).
+        self._flushed_completed: Set[Any] = set()
+        # Tasks whose LLM call or write failed; they are not completed and are retried on --resume.
+        self.failed: Dict[int, Dict[str, Any]] = {}
+        self.api_results: Dict[int, Any] = {}
+        # Untrimmed records from each api_call task, rendered into files by 'generate_data' tasks.
+        self.api_records: Dict[int, List[Dict[str, Any]]] = {}
+        self.max_revisions_per_task = max_revisions_per_task
+        self.revision_counts: Dict[int, int] = {}
+        self.seen_hashes: Dict[int, List[str]] = {}
+        self.seen_feedback: Dict[int, List[str]] = {}
+        # Short record of every task that has been dispatched, shown to the LLM when it edits the plan.
+        self.started_tasks: Dict[int, Dict[str, Any]] = {}
+        self.approved_hashes: Dict[str, str] = {}
+        self.finished = False
+        self.checkpoint_path = checkpoint_path
+        # When set, every file the plan touches is placed under this directory (used by batch runs).
+        self.output_dir = output_dir
+
+    def attach_services(self, services):
+        self.llm = services.llm("planner")
 
     def execute_task(self, task: Dict[str, Any]) -> str:
         self.goal = task.get("goal")
@@ -21,186 +47,330 @@ class PlannerAgent(BaseAgent):
 
         print(f"[{self.name}] received new goal: {self.goal}")
         self._generate_and_send_plan()
+        self._save_checkpoint()
 
         return f"Plan generation started for goal: {self.goal}"
+
+    def _save_checkpoint(self):
+        if not self.checkpoint_path:
+            return
+        # Files go to disk before the state that refers to them, so a resumed run never trusts a missing file.
+        # That only matters once a task that owns a file completes; revisions and other messages stay in the
+        # overlay and are written with the next completed file task, or by the flush at the end of the run.
+        newly_completed = self.completed - self._flushed_completed
+        owns_file = any(self.started_tasks.get(task_id, {}).get("file_path") for task_id in newly_completed)
+        if self.workspace and (owns_file or self.finished):
+            self.workspace.flush()
+        self._flushed_completed = set(self.completed)
+        state = {
+            "goal": self.goal,
+            "plan": self.plan,
+            "running": self.running,
+            "completed": sorted(self.completed, key=str),
+            "failed": self.failed,
+            "current_task_id": self.current_task_id,
+            "search_history": self.search_history,
+            "last_api_result": self.last_api_result,
+            "api_results": self.api_results,
+            "api_records": self.api_records,
+            "evaluation_history": self.evaluation_history,
+            "revision_counts": self.revision_counts,
+            "seen_hashes": self.seen_hashes,
+            "seen_feedback": self.seen_feedback,
+            "started_tasks": self.started_tasks,
+            "approved_hashes": self.approved_hashes,
+            "finished": self.finished,
+        }
+        try:
+            save_checkpoint(self.checkpoint_path, state)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"[{self.name}] Failed to save checkpoint: {e}")
+
+    def resume(self) -> str:
+        state = load_checkpoint(self.checkpoint_path) if self.checkpoint_path else None
+        if not state:
+            return f"Error: no checkpoint found at '{self.checkpoint_path}'."
+
+        self.goal = state.get("goal", "")
+        self.plan = state.get("plan", [])
+        self.completed = set(state.get("completed", []))
+        self.current_task_id = state.get("current_task_id", -1)
+        self.search_history = state.get("search_history", [])
+        self.last_api_result = state.get("last_api_result")
+        self.api_results = int_keys(state.get("api_results"))
+        self.api_records = int_keys(state.get("api_records"))
+        self.evaluation_history = state.get("evaluation_history", [])
+        self.revision_counts = int_keys(state.get("revision_counts"))
+        self.seen_hashes = int_keys(state.get("seen_hashes"))
+        self.seen_feedback = int_keys(state.get("seen_feedback"))
+        self.started_tasks = int_keys(state.get("started_tasks"))
+        self._flushed_completed = set(self.completed)
+        self.approved_hashes = state.get("approved_hashes", {})
+        self.finished = state.get("finished", False)
+        self.running = {}
+        if self.finished:
+            print(f"[{self.name}] Checkpoint is for a finished run; nothing to resume.")
+            return "Nothing to resume."
+
+        # Work that was in flight or failed when the run stopped is lost; schedule it again.
+        interrupted = list(int_keys(state.get("running")).values()) + list(int_keys(state.get("failed")).values())
+        self.plan = interrupted + self.plan
+        self.failed = {}
+        self._skip_approved_files()
+        print(f"[{self.name}] Resuming goal with {len(self.completed)} completed and {len(self.plan)} pending tasks.")
+
+        if not self.plan and not self.completed:
+            self._generate_and_send_plan()
+        else:
+            self._send_next_task()
+        self._save_checkpoint()
+        return f"Resumed goal: {self.goal}"
+
+    def _skip_approved_files(self):
+        # Files whose content still matches an approved evaluation don't need to be written or evaluated again.
+        for task in list(self.plan):
+            file_path = task.get("file_path")
+            if task.get("action") not in ("write_code", "evaluate_code") or file_path not in self.approved_hashes:
+                continue
+            if self.workspace.hash(file_path) != self.approved_hashes[file_path]:
+                continue
+            print(f"[{self.name}] Skipping task {task.get('task_id')}: '{file_path}' already matches an approved version.")
+            self.plan.remove(task)
+            self.completed.add(task.get("task_id"))
     
-    def _generate_and_send_plan(self):
+    def _generate_and_send_plan(self, keep_progress: bool = False):
         plan_str = self._generate_plan(self.goal, self.search_history)
+        if plan_str is None:
+            print(f"[{self.name}] Failed to generate a plan: the LLM call failed. Rerun with --resume to retry.")
+            return
         try:
-            self.plan = json.loads(plan_str)
-            print(f"[{self.name}] generated plan:\n{json.dumps(self.plan, indent=2)}")
-            self._send_next_task()
+            plan = self._place_in_output_dir(self._normalize_dependencies(json.loads(plan_str)))
         except json.JSONDecodeError as e:
             print(f"[{self.name}] Failed to parse plan as JSON: {e}")
+            return
+        if keep_progress:
+            # A replan in the middle of a run: finished, running and failed tasks keep their state.
+            self.plan = self._merge_replan(plan)
+        else:
+            self.plan = plan
+            self.running = {}
+            self.completed = set()
+            self.failed = {}
+            self.api_results = {}
+            self.api_records = {}
+            self.revision_counts = {}
+            self.seen_hashes = {}
+            self.seen_feedback = {}
+            self.started_tasks = {}
+        print(f"[{self.name}] generated plan:\n{json.dumps(self.plan, indent=2)}")
+        self._request_search_prefetch()
+        self._send_next_task()
 
-    def _generate_plan(self, goal: str, search_history: list = []) -> str:
-        system_prompt = """
-You are an expert planner. Your task is to break down a user's goal into a series of smaller, manageable tasks.
-You can use a 'search' action to gather information if the goal is ambiguous.
-You can use 'api_call' to interact with one or more HTTP APIs to get data for subsequent tasks.
-Your output MUST be a JSON array of objects. Each object represents a task and must have the following keys:
-- "task_id": (integer) A unique identifier for the task, starting from 1.
-- "action": (string) The action to be performed. Must be one of: "search", "api_call", "write_code", "evaluate_code", "finish".
-- "description": (string) A clear and concise description of the task.
-- "file_path": (string, optional) The full path to the file relevant to the task.
-- "query": (string, optional) The search query for the 'search' action.
-- "requests": (list, optional) For 'api_call' actions, a list of API requests to make. Each object in the list should have:
-    - "url": (string) The URL for the API call.
-    - "method": (string, optional) The HTTP method. Defaults to "GET".
-    - "params": (dict, optional) URL parameters.
-    - "data": (dict, optional) The request body.
-- "status": "pending"
-
-For each piece of functionality, create a 'write_code' task followed by an 'evaluate_code' task.
-If you need data from an API for a 'write_code' task, place an 'api_call' task immediately before it.
-If the goal is ambiguous, start with a 'search' task.
-The very last step MUST be an action of type 'finish'.
-
-Example:
-Goal: "Create a complete front-end for an arxiv cs daily website. This includes creating data.js for paper data, a script.js for DOM manipulation, an index.html for the main page, a category.html for filtered views, a detail.html for paper details, and a style.css for styling."
-
-Your JSON Output:
-[
-    {
-        "task_id": 1,
-        "action": "api_call",
-        "description": "Fetch arxiv papers data.",
-        "requests": [
-            {
-                "url": "https://export.arxiv.org/api/query?search_query=cat:cs.AI&sortBy=lastUpdatedDate&sortOrder=descending&max_results=2"
-            },
-            {
-                "url": "https://export.arxiv.org/api/query?search_query=cat:cs.RO&sortBy=lastUpdatedDate&sortOrder=descending&max_results=2"
-            },
+    def _merge_replan(self, plan: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # New tasks that repeat a started one (same action and file, or same action and description) are dropped
+        # and their dependents point at the started task; the rest get ids that are not taken yet.
+        def key(task):
+            return task.get("action"), task.get("file_path") or task.get("description")
+
+        started = {key(summary): task_id for task_id, summary in self.started_tasks.items()
+                   if task_id in self.completed or task_id in self.running or task_id in self.failed}
+        taken = set(self.started_tasks) | self.completed | set(self.running) | set(self.failed)
+        next_id = max([task_id for task_id in taken if isinstance(task_id, int)], default=0) + 1
+        ids, kept = {}, []
+        for task in plan:
+            if task.get("action") != "finish" and key(task) in started:
+                ids[task.get("task_id")] = started[key(task)]
+                continue
+            if task.get("task_id") in taken:
+                ids[task.get("task_id")] = next_id
+                next_id += 1
+            else:
+                ids[task.get("task_id")] = task.get("task_id")
+            kept.append(task)
+        for task in kept:
+            task["task_id"] = ids[task.get("task_id")]
+            task["depends_on"] = list(dict.fromkeys(ids.get(dep, dep) for dep in task.get("depends_on", []) if ids.get(dep, dep) != task["task_id"]))
+        return kept
+
+    def _edit_plan(self, findings: Any) -> bool:
+        # Asks the LLM for insert/modify/drop edits to the tasks that have not started, so the cost of a
+        # replan depends on the remaining plan rather than on the whole history. False means it failed.
+        started = [dict(summary, status="completed" if task_id in self.completed else "running") for task_id, summary in self.started_tasks.items()]
+        remaining = [{key: value for key, value in task.items() if key not in ("status", "api_data")} for task in self.plan]
+        response = self.llm.generate_completion(
+            plan_edit_messages(self.goal, started, remaining, findings),
+            temperature=0.2,
+            response_format={"type": "json_object"},
+            task_type="replan",
+        )
+        if response is None:
+            return False
+        try:
+            edits = json.loads(response).get("edits")
+            if not isinstance(edits, list):
+                raise ValueError("'edits' must be a list")
+            plan = self._apply_plan_edits([dict(task) for task in self.plan], edits)
+        except (ValueError, AttributeError, TypeError) as e:
+            print(f"[{self.name}] Could not apply plan edits: {e}")
+            return False
+        self.plan = self._place_in_output_dir(plan)
+        print(f"[{self.name}] applied {len(edits)} plan edit(s); {len(self.plan)} task(s) remaining.")
+        self._request_search_prefetch()
+        return True
+
+    def _apply_plan_edits(self, plan: List[Dict[str, Any]], edits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        editable = ("action", "description", "file_path", "query", "requests", "variable", "fields", "depends_on")
+        # Inserted tasks whose id is taken are renumbered; later edits in the batch may still depend on the old id.
+        renamed: Dict[Any, int] = {}
+        for edit in edits:
+            op = edit.get("op")
+            by_id = {task.get("task_id"): task for task in plan}
+            if op == "insert":
+                task = dict(edit.get("task") or {})
+                if task.get("action") not in ("search", "api_call", "write_code", "generate_data", "evaluate_code"):
+                    raise ValueError(f"cannot insert a task with action {task.get('action')!r}")
+                task["depends_on"] = [renamed.get(dep, dep) for dep in task.get("depends_on", [])]
+                taken = set(by_id) | set(self.started_tasks) | self.completed | set(self.running) | set(self.failed)
+                if task.get("task_id") in taken or not isinstance(task.get("task_id"), int):
+                    new_id = max([task_id for task_id in taken if isinstance(task_id, int)], default=0) + 1
+                    renamed[task.get("task_id")] = new_id
+                    task["task_id"] = new_id
+                task["status"] = "pending"
+                finish_index = next((index for index, other in enumerate(plan) if other.get("action") == "finish"), len(plan))
+                plan.insert(finish_index, task)
+            elif op == "modify":
+                task = by_id.get(edit.get("task_id"))
+                if task is None or task.get("action") == "finish":
+                    raise ValueError(f"cannot modify task {edit.get('task_id')}: it is not a remaining task")
+                changes = {key: value for key, value in (edit.get("changes") or {}).items() if key in editable}
+                if "depends_on" in changes:
+                    changes["depends_on"] = [renamed.get(dep, dep) for dep in changes["depends_on"] or []]
+                task.update(changes)
+            elif op == "drop":
+                task = by_id.get(edit.get("task_id"))
+                if task is None or task.get("action") == "finish":
+                    raise ValueError(f"cannot drop task {edit.get('task_id')}: it is not a remaining task")
+                plan.remove(task)
+            else:
+                raise ValueError(f"unknown edit op {op!r}")
+
+        known = {task.get("task_id") for task in plan} | set(self.started_tasks) | self.completed | set(self.running) | set(self.failed)
+        for task in plan:
+            if task.get("action") == "finish":
+                task["depends_on"] = sorted(task_id for task_id in known if task_id != task.get("task_id"))
+            else:
+                task["depends_on"] = [dep for dep in task.get("depends_on", []) if dep in known and dep != task.get("task_id")]
+        return plan
+
+    def _request_search_prefetch(self):
+        # Let the Coder warm up web searches for every coding task while earlier tasks are still running.
+        api_task_ids = {task.get("task_id") for task in self.plan if task.get("action") == "api_call"}
+        coding_tasks = [
             {
-                "url": "https://export.arxiv.org/api/query?search_query=cat:cs.CV&sortBy=lastUpdatedDate&sortOrder=descending&max_results=2"
+                "description": task.get("description"),
+                "file_path": task.get("file_path"),
+                "api_data": any(dep in api_task_ids for dep in task.get("depends_on", [])),
             }
-        ],
-        "status": "pending"
-    },
-    {
-        "task_id": 2,
-        "action": "write_code",
-        "description": "Create the data.js file with sample paper data. It should be an array of javascript objects, each with fields like id, title, authors, abstract, etc.",
-        "file_path": "output/arxiv_cs_daily/data.js",
-        "status": "pending"
-    },
-    {
-        "task_id": 3,
-        "action": "evaluate_code",
-        "description": "Evaluate data.js to ensure it contains valid javascript and the data structure is correct.",
-        "file_path": "output/arxiv_cs_daily/data.js",
-        "status": "pending"
-    },
-    {
-        "task_id": 4,
-        "action": "write_code",
-        "description": "Create the style.css file with some basic styling for the website.",
-        "file_path": "output/arxiv_cs_daily/style.css",
-        "status": "pending"
-    },
-    {
-        "task_id": 5,
-        "action": "evaluate_code",
-        "description": "Evaluate style.css to ensure it contains valid CSS.",
-        "file_path": "output/arxiv_cs_daily/style.css",
-        "status": "pending"
-    },
-    {
-        "task_id": 6,
-        "action": "write_code",
-        "description": "Create the index.html file. It should have a list of CS categories and link to the category pages.",
-        "file_path": "output/arxiv_cs_daily/index.html",
-        "status": "pending"
-    },
-    {
-        "task_id": 7,
-        "action": "evaluate_code",
-        "description": "Evaluate index.html for valid HTML structure and correct links.",
-        "file_path": "output/arxiv_cs_daily/index.html",
-        "status": "pending"
-    },
-    {
-        "task_id": 8,
-        "action": "write_code",
-        "description": "Create the category.html file. It should display a filtered list of papers based on a category parameter.",
-        "file_path": "output/arxiv_cs_daily/category.html",
-        "status": "pending"
-    },
-    {
-        "task_id": 9,
-        "action": "evaluate_code",
-        "description": "Evaluate category.html for valid HTML structure and correct filtering logic.",
-        "file_path": "output/arxiv_cs_daily/category.html",
-        "status": "pending"
-    },
-    {
-        "task_id": 10,
-        "action": "write_code",
-        "description": "Create the detail.html file. It should display the details of a single paper.",
-        "file_path": "output/arxiv_cs_daily/detail.html",
-        "status": "pending"
-    },
-    {
-        "task_id": 11,
-        "action": "evaluate_code",
-        "description": "Evaluate detail.html for valid HTML structure and correct display of paper details.",
-        "file_path": "output/arxiv_cs_daily/detail.html",
-        "status": "pending"
-    },
-    {
-        "task_id": 12,
-        "action": "write_code",
-        "description": "Create the script.js file. It should contain functions to load and render paper data from data.js, handle category filtering, and display paper details.",
-        "file_path": "output/arxiv_cs_daily/script.js",
-        "status": "pending"
-    },
-    {
-        "task_id": 13,
-        "action": "evaluate_code",
-        "description": "Evaluate script.js for valid javascript and correct functionality across all pages.",
-        "file_path": "output/arxiv_cs_daily/script.js",
-        "status": "pending"
-    },
-    {
-        "task_id": 14,
-        "action": "finish",
-        "description": "Summarize the project and evaluation results.",
-        "file_path": "",
-        "status": "pending"
-    }
-]
-"""
-        history_context = ""
-        if search_history:
-            history_str = json.dumps(search_history, indent=2)
-            history_context = f"\n\nHere is the search history for your reference:\n{history_str}"
-            
-        user_message = f"Please generate a plan for the following goal:\n\n**Goal:** {goal}{history_context}"
-        
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_message}
+            for task in self.plan if task.get("action") == "write_code"
         ]
-        
+        if coding_tasks:
+            self.send_message("Coder", {"type": "search_prefetch", "tasks": coding_tasks})
+
+    def _generate_plan(self, goal: str, search_history: list = []) -> str:
         return self.llm.generate_completion(
-            messages,
+            planner_messages(goal, search_history),
             temperature=0.2,
             response_format={"type": "json_object"}
         )
 
+    def _normalize_dependencies(self, plan: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Tasks without explicit edges depend on the task before them, which keeps old plans serial.
+        task_ids = [task.get("task_id") for task in plan]
+        previous_id = None
+        for task in plan:
+            task_id = task.get("task_id")
+            if task.get("action") == "finish":
+                task["depends_on"] = [other for other in task_ids if other != task_id]
+            elif "depends_on" not in task:
+                task["depends_on"] = [previous_id] if previous_id is not None else []
+            else:
+                unknown = [dep for dep in task["depends_on"] if dep not in task_ids or dep == task_id]
+                if unknown:
+                    print(f"[{self.name}] Task {task_id} depends on unknown tasks {unknown}; ignoring them.")
+                task["depends_on"] = [dep for dep in task["depends_on"] if dep not in unknown]
+            previous_id = task_id
+        return plan
+
+    def _place_in_output_dir(self, plan: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not self.output_dir:
+            return plan
+        for task in plan:
+            file_path = task.get("file_path")
+            if not file_path or os.path.normpath(file_path).startswith(os.path.normpath(self.output_dir) + os.sep):
+                continue
+            # output_dir is the site root, so the goal's own "output/<site>/" prefix is dropped:
+            # "output/site/css/style.css" -> "<output_dir>/css/style.css". Nothing may escape output_dir.
+            parts = [part for part in os.path.normpath(file_path).replace("\\", "/").split("/") if part not in ("", ".", "..")]
+            if len(parts) > 1 and parts[0] == "output":
+                parts = parts[2:] if len(parts) > 2 else parts[1:]
+            task["file_path"] = os.path.join(self.output_dir, *parts)
+        return plan
+
+    def _is_ready(self, task: Dict[str, Any]) -> bool:
+        if not all(dep in self.completed for dep in task.get("depends_on", [])):
+            return False
+        # Never let two in-flight tasks touch the same file.
+        file_path = task.get("file_path")
+        return not file_path or all(running.get("file_path") != file_path for running in self.running.values())
+
     def _send_next_task(self):
         if not self.plan:
-            print(f"[{self.name}] Plan is empty or complete.")
+            if not self.running:
+                print(f"[{self.name}] Plan is empty or complete.")
+            return
+
+        while self.plan and len(self.running) < self.max_parallel_tasks:
+            next_task = next((task for task in self.plan if self._is_ready(task)), None)
+            if next_task is None:
+                break
+            self.plan.remove(next_task)
+            self._dispatch(next_task)
+
+        if self.plan and not self.running and self.failed:
+            # The remaining tasks wait on failed ones; stop here and let --resume retry them.
+            print(f"[{self.name}] Stopping: tasks {sorted(self.failed)} failed and {len(self.plan)} tasks depend on them. Rerun with --resume to retry.")
             return
 
-        next_task = self.plan.pop(0)
+        if self.plan and not self.running:
+            # Nothing is in flight and nothing is ready: the dependency graph has a cycle.
+            print(f"[{self.name}] No task is ready to run; falling back to plan order.")
+            self._dispatch(self.plan.pop(0))
+
+    def _complete_task(self, task_id: int):
+        self.running.pop(task_id, None)
+        self.completed.add(task_id)
+        self._send_next_task()
+
+    def _fail_task(self, task_id: int, reason: str):
+        print(f"[{self.name}] Task {task_id} failed: {reason}")
+        task = self.running.pop(task_id, None)
+        if task is not None:
+            self.failed[task_id] = {key: value for key, value in task.items() if key not in ("type", "requester", "api_data")}
+        self._send_next_task()
+
+    def _dispatch(self, next_task: Dict[str, Any]):
         self.current_task_id = next_task.get("task_id")
+        self.started_tasks[self.current_task_id] = {key: next_task[key] for key in ("task_id", "action", "description", "file_path") if next_task.get(key)}
         action = next_task.get("action")
 
-        if self.last_api_result:
-            next_task["api_data"] = self.last_api_result
-            self.last_api_result = None
+        api_data = []
+        for dep in next_task.get("depends_on", []):
+            api_data.extend(self.api_results.get(dep, []))
+        if api_data:
+            next_task["api_data"] = api_data
+
+        if action in ("search", "api_call", "write_code", "generate_data", "evaluate_code"):
+            self.running[self.current_task_id] = next_task
 
         if action == "search":
             next_task["type"] = "search_request"
@@ -216,31 +386,42 @@ Your JSON Output:
             next_task["type"] = "coding_task"
             self.send_message("Coder", next_task)
             print(f"[{self.name}] Sent task {self.current_task_id} ({action}) to Coder.")
+        elif action == "generate_data":
+            # The records travel with the message only; the running task stays small in checkpoints.
+            records = [record for dep in next_task.get("depends_on", []) for record in self.api_records.get(dep, [])]
+            self.send_message("Coder", dict(next_task, type="data_task", records=records))
+            print(f"[{self.name}] Sent task {self.current_task_id} ({action}, {len(records)} records) to Coder.")
         elif action == "evaluate_code":
-            next_task["type"] = "evaluation_request"
-            next_task["requester"] = self.name
-            next_task["goal"] = next_task["description"]
-            self.send_message("Evaluator", next_task)
-            print(f"[{self.name}] Sent task {self.current_task_id} ({action}) to Evaluator.")
+            self._send_evaluation(next_task)
         elif action == "finish":
+            if self.failed:
+                # Only reachable when a fallback dispatched it early; the run is not done until every task succeeded.
+                self.plan.insert(0, next_task)
+                print(f"[{self.name}] Not finishing: tasks {sorted(self.failed)} failed. Rerun with --resume to retry.")
+                return
+            self.completed.add(self.current_task_id)
             self._summarize_and_finish()
+            self.finished = True
         else:
             print(f"[{self.name}] Unknown action: {action}")
-            self._send_next_task()
+            self._complete_task(self.current_task_id)
+
+    def _send_evaluation(self, task: Dict[str, Any]):
+        evaluation_task = dict(task)
+        evaluation_task["type"] = "evaluation_request"
+        evaluation_task["requester"] = self.name
+        evaluation_task["goal"] = task["description"]
+        self.send_message("Evaluator", evaluation_task)
+        print(f"[{self.name}] Sent task {task.get('task_id')} ({task.get('action')}) to Evaluator.")
 
     def _summarize_and_finish(self):
         print(f"[{self.name}] Summarizing and finishing project.")
         
-        summary_prompt = "You are a project manager. Based on the following evaluation history, provide a concise summary of the project's development process and the final outcome."
-        
-        history_str = json.dumps(self.evaluation_history, indent=2)
-        
-        messages = [
-            {"role": "system", "content": summary_prompt},
-            {"role": "user", "content": f"Evaluation History:\n{history_str}"}
-        ]
+        # Results arrive in whatever order parallel tasks finish; sort by task so the prompt is reproducible.
+        history = sorted(self.evaluation_history, key=lambda entry: entry.get("task_id") or 0)
+        messages = summary_messages(history)
         
-        summary = self.llm.generate_completion(messages, temperature=0.5)
+        summary = self.llm.generate_completion(messages, temperature=0.5, task_type="summary") or "No summary available: the LLM call failed or the call budget is exhausted."
         
         print("\n" + "="*50)
         print(" " * 20 + "PROJECT SUMMARY")
@@ -250,19 +431,85 @@ Your JSON Output:
         print(f"[{self.name}] Project finished.")
 
 
+    def _revision_stop_reason(self, task_id: int, message: Dict[str, Any]) -> str:
+        # Records this evaluation and returns why another revision would be wasted, or "" to revise.
+        hashes = self.seen_hashes.setdefault(task_id, [])
+        feedbacks = self.seen_feedback.setdefault(task_id, [])
+        file_hash = message.get("content_hash")
+        feedback = " ".join(str(message.get("feedback", "")).lower().split())
+        repeated_hash = file_hash is not None and file_hash in hashes
+        repeated_feedback = feedback in feedbacks
+        if file_hash is not None:
+            hashes.append(file_hash)
+        feedbacks.append(feedback)
+
+        if self.revision_counts.get(task_id, 0) >= self.max_revisions_per_task:
+            return f"the revision budget of {self.max_revisions_per_task} is used up"
+        if repeated_hash:
+            return "the file is identical to a version that was already rejected"
+        if repeated_feedback:
+            return "the evaluator repeated earlier feedback"
+        return ""
+
+    def _stop_revising(self, task_id: int, file_path: str, reason: str):
+        print(f"[{self.name}] Stopping revisions for task {task_id} ({file_path}): {reason}.")
+        self.evaluation_history.append({
+            "type": "evaluation_result",
+            "task_id": task_id,
+            "file_path": file_path,
+            "status": "revision_stopped",
+            "feedback": reason,
+        })
+        self._complete_task(task_id)
+
     def receive_message(self, sender: str, message: Dict[str, Any]):
+        try:
+            self._handle_message(sender, message)
+        finally:
+            self._save_checkpoint()
+
+    def _handle_message(self, sender: str, message: Dict[str, Any]):
+        task_id = message.get("task_id", self.current_task_id)
+        if message.get("type") in ("task_complete", "task_failed", "evaluation_result", "search_result", "api_result") and task_id not in self.running:
+            print(f"[{self.name}] Ignoring stale {message.get('type')} for task {task_id} from {sender}.")
+            return
+
         if message.get("type") == "task_complete" and sender == "Coder":
-            print(f"[{self.name}] received task completion for task {self.current_task_id} from Coder.")
-            self._send_next_task()
+            print(f"[{self.name}] received task completion for task {task_id} from Coder.")
+            task = self.running[task_id]
+            if task.get("action") == "evaluate_code":
+                if message.get("content_hash") in self.seen_hashes.get(task_id, []):
+                    self._stop_revising(task_id, task.get("file_path"), "the revision produced a file that was already evaluated")
+                else:
+                    # A revision for this evaluation finished; evaluate the file again.
+                    self._send_evaluation(task)
+            else:
+                if message.get("data_schema"):
+                    # Tasks that depend on a generated data file get its shape in place of the API data.
+                    self.api_results[task_id] = [message["data_schema"]]
+                self._complete_task(task_id)
+        elif message.get("type") == "task_failed":
+            self._fail_task(task_id, message.get("error") or f"{sender} could not finish it")
         elif message.get("type") == "evaluation_result":
             status = message.get("status")
             self.evaluation_history.append(message)
-            print(f"[{self.name}] received evaluation result for task {self.current_task_id} from Evaluator: {status}")
+            print(f"[{self.name}] received evaluation result for task {task_id} from Evaluator: {status}")
             if status == "approved":
-                self._send_next_task()
+                if message.get("file_path") and message.get("content_hash"):
+                    self.approved_hashes[message["file_path"]] = message["content_hash"]
+                self._complete_task(task_id)
             elif status == "requires_revision":
+                if self.manager and self.manager.llm_budget.exhausted:
+                    # Not a verdict on the file: the revision is left for --resume.
+                    self._fail_task(task_id, "the run's LLM call budget is exhausted")
+                    return
+                stop_reason = self._revision_stop_reason(task_id, message)
+                if stop_reason:
+                    self._stop_revising(task_id, message.get("file_path"), stop_reason)
+                    return
+                self.revision_counts[task_id] = self.revision_counts.get(task_id, 0) + 1
                 revision_task = {
-                    "task_id": self.current_task_id,
+                    "task_id": task_id,
                     "action": "write_code",
                     "type": "evaluation_result",
                     "description": "Revise code based on feedback",
@@ -270,16 +517,22 @@ Your JSON Output:
                     "status": "requires_revision",
                     "feedback": message.get("feedback")
                 }
-                self.plan.insert(0, self.plan.pop(0))
-                self.plan.insert(0, revision_task)
-                self._send_next_task()
+                self.send_message("Coder", revision_task)
+                print(f"[{self.name}] Sent revision for task {task_id} to Coder.")
+            else:
+                self._fail_task(task_id, f"evaluation failed: {message.get('feedback')}")
         elif message.get("type") == "search_result":
-            print(f"[{self.name}] received search result for task {self.current_task_id} from Searcher.")
+            print(f"[{self.name}] received search result for task {task_id} from Searcher.")
             self.search_history.append(message.get("results"))
-            self._generate_and_send_plan()
+            if not self._edit_plan(message.get("results")):
+                print(f"[{self.name}] Falling back to a full replan.")
+                self._generate_and_send_plan(keep_progress=True)
+            self._complete_task(task_id)
         elif message.get("type") == "api_result":
-            print(f"[{self.name}] received api result for task {self.current_task_id} from Searcher.")
+            print(f"[{self.name}] received api result for task {task_id} from Searcher.")
             self.last_api_result = message.get("results")
-            self._send_next_task()
+            self.api_results[task_id] = self.last_api_result
+            self.api_records[task_id] = message.get("records") or []
+            self._complete_task(task_id)
         else:
-            super().receive_message(sender, message)
\ No newline at end of file
+            super().receive_message(sender, message)
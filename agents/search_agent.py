@@ -1,12 +1,20 @@
 from agents.base_agent import BaseAgent
 from typing import Dict, Any
-from tools.brave_search import BraveSearch
-from tools.api_tool import api_tool
+from tools.data_emitter import iter_records
+from tools.response_normalizers import normalize_response, fit_to_budget
 
 class SearchAgent(BaseAgent):
-    def __init__(self, name: str = "Searcher", role: str = "Information Retrieval Specialist"):
+    max_concurrency = 4
+
+    def __init__(self, name: str = "Searcher", role: str = "Information Retrieval Specialist", api_token_budget: int = 4000):
         super().__init__(name, role)
-        self.search_tool = BraveSearch()
+        self.search_tool = None
+        self.http_pool = None
+        self.api_token_budget = api_token_budget
+
+    def attach_services(self, services):
+        self.search_tool = services.search
+        self.http_pool = services.http_pool
 
     def execute_task(self, task: Dict[str, Any]) -> str:
         action = task.get("action")
@@ -25,6 +33,7 @@ class SearchAgent(BaseAgent):
             print(f"[{self.name}] found results. Sending back to '{requester}'.")
             self.send_message(requester, {
                 "type": "search_result",
+                "task_id": task.get("task_id"),
                 "results": search_results
             })
             return f"Search completed for: {query}"
@@ -34,25 +43,19 @@ class SearchAgent(BaseAgent):
             if not requests_list or not isinstance(requests_list, list):
                 return "Error: 'requests' must be a list of API calls."
 
-            all_results = []
             for api_request in requests_list:
-                url = api_request.get("url")
-                if not url:
-                    all_results.append("Error: 'url' is required for each API call in the 'requests' list.")
-                    continue
-
-                method = api_request.get("method", "GET")
-                params = api_request.get("params")
-                data = api_request.get("data")
-
-                print(f"[{self.name}] received api request from '{requester}': {method} {url}")
-                api_results = api_tool(url=url, method=method, params=params, data=data)
-                all_results.append(api_results)
+                print(f"[{self.name}] received api request from '{requester}': {api_request.get('method', 'GET')} {api_request.get('url')}")
+            responses = self.http_pool.fetch_all(requests_list)
+            normalized = [normalize_response(api_request.get("url"), response) for api_request, response in zip(requests_list, responses)]
+            all_results = fit_to_budget(normalized, self.api_token_budget)
 
             print(f"[{self.name}] got all api responses. Sending back to '{requester}'.")
             self.send_message(requester, {
                 "type": "api_result",
-                "results": all_results
+                "task_id": task.get("task_id"),
+                "results": all_results,
+                # Every normalized record, untrimmed, for 'generate_data' tasks; the LLM only sees "results".
+                "records": list(iter_records(normalized))
             })
             return f"API calls completed for task."
         
@@ -0,0 +1,54 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+from tools.checkpoint import save_checkpoint
+
+class MissingFixture(KeyError):
+    pass
+
+class Cassette:
+    # Recorded LLM, search and HTTP interactions for one benchmark goal, keyed by a hash of the request.
+    # Each entry keeps the response and how long the real call took, so replays can reproduce latency.
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f).get("entries", {})
+
+    @staticmethod
+    def key(kind: str, request: Any) -> str:
+        payload = json.dumps({"kind": kind, "request": request}, sort_keys=True, ensure_ascii=False, default=str)
+        return f"{kind}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+    def get(self, key: str) -> Dict[str, Any]:
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                raise MissingFixture(key)
+            return entry
+
+    def put(self, key: str, response: Any, latency: float):
+        with self._lock:
+            self.entries[key] = {"response": response, "latency": round(latency, 4)}
+
+    def save(self):
+        with self._lock:
+            save_checkpoint(self.path, {"entries": self.entries})
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+class Latency:
+    # Replay latency: the recorded duration scaled by `scale`, or a fixed number of seconds.
+    def __init__(self, scale: float = 1.0, fixed: Optional[float] = None):
+        self.scale = scale
+        self.fixed = fixed
+
+    def __call__(self, recorded: float) -> float:
+        return self.fixed if self.fixed is not None else recorded * self.scale
@@ -0,0 +1,263 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from typing import Any, Dict, List, Optional
+from benchmarks.cassette import Cassette, Latency, MissingFixture
+from llm.router import LLMRouter, RoutedLLM
+from llm.stub_server import StubLLMServer
+from main import INITIAL_GOAL
+from services import Services
+from tools.brave_search import BraveSearch
+from tools.checkpoint import load_checkpoint, save_checkpoint
+from tools.http_pool import HttpPool
+from tracing import tracer
+from workflow import build_manager, load_goals
+
+# Record real LLM, Brave and HTTP traffic once with --record, then replay it offline through the local
+# stub server to measure how changes to the agents affect wall time, LLM calls, tokens and revisions.
+
+DEFAULT_GOALS = [
+    {"id": "arxiv_cs_daily", "goal": INITIAL_GOAL},
+    {
+        "id": "todo_app",
+        "goal": "Create a small to-do list web app with index.html, style.css and app.js. Tasks can be added, "
+                "marked as done and removed, and are kept in localStorage. The entire project should be in an "
+                "\"output/todo_app\" directory.",
+    },
+]
+
+METRICS = ("wall_s", "llm_calls", "prompt_tokens", "completion_tokens", "revisions", "agent_hops")
+
+def llm_request(messages, temperature, max_tokens, response_format) -> Dict[str, Any]:
+    # The model is left out so a recording can be replayed whatever the routes point at.
+    return {"messages": messages, "temperature": temperature, "max_tokens": max_tokens, "response_format": response_format or None}
+
+class RecordingLLM:
+    # Wraps a RoutedLLM during --record and stores every completion in the cassette.
+    def __init__(self, inner: RoutedLLM, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    @property
+    def model(self) -> str:
+        return self.inner.model
+
+    @property
+    def budget(self):
+        return self.inner.budget
+
+    @budget.setter
+    def budget(self, budget):
+        self.inner.budget = budget
+
+    def generate_completion(self, messages, temperature=0.7, max_tokens=2048, response_format=None, task_type=None):
+        start = time.perf_counter()
+        content = self.inner.generate_completion(messages, temperature=temperature, max_tokens=max_tokens, response_format=response_format, task_type=task_type)
+        if content is not None:
+            self.cassette.put(Cassette.key("llm", llm_request(messages, temperature, max_tokens, response_format)), content, time.perf_counter() - start)
+        return content
+
+    def stream_completion(self, messages, temperature=0.7, max_tokens=2048, response_format=None, task_type=None):
+        start = time.perf_counter()
+        parts = []
+        for chunk in self.inner.stream_completion(messages, temperature=temperature, max_tokens=max_tokens, response_format=response_format, task_type=task_type):
+            parts.append(chunk)
+            yield chunk
+        self.cassette.put(Cassette.key("llm", llm_request(messages, temperature, max_tokens, response_format)), "".join(parts), time.perf_counter() - start)
+
+class CassetteSearch:
+    # Records through `inner` when it is given, otherwise replays from the cassette.
+    def __init__(self, cassette: Cassette, inner: Optional[BraveSearch] = None, latency: Optional[Latency] = None):
+        self.cassette = cassette
+        self.inner = inner
+        self.latency = latency or Latency()
+
+    def search(self, query: str, num_results: int = 5):
+        key = Cassette.key("search", {"query": query, "num_results": num_results})
+        if self.inner is not None:
+            start = time.perf_counter()
+            result = self.inner.search(query, num_results)
+            self.cassette.put(key, result, time.perf_counter() - start)
+            return result
+        try:
+            entry = self.cassette.get(key)
+        except MissingFixture:
+            return f"Error: no recorded search results for '{query}'."
+        time.sleep(self.latency(entry["latency"]))
+        return entry["response"]
+
+class CassetteHttpPool(HttpPool):
+    def __init__(self, cassette: Cassette, record: bool, latency: Optional[Latency] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+        self.record = record
+        self.latency = latency or Latency()
+
+    def _fetch(self, api_request: Dict[str, Any]) -> str:
+        key = Cassette.key("http", {field: api_request.get(field) for field in ("url", "method", "params", "data")})
+        if self.record:
+            start = time.perf_counter()
+            result = super()._fetch(api_request)
+            self.cassette.put(key, result, time.perf_counter() - start)
+            return result
+        try:
+            entry = self.cassette.get(key)
+        except MissingFixture:
+            return f"Error: no recorded response for {api_request.get('url')}."
+        time.sleep(self.latency(entry["latency"]))
+        return entry["response"]
+
+class RecordingServices(Services):
+    def __init__(self, cassette: Cassette):
+        super().__init__(http_pool=CassetteHttpPool(cassette, record=True))
+        self.cassette = cassette
+
+    @property
+    def search(self):
+        return self._get("_search", lambda: CassetteSearch(self.cassette, inner=BraveSearch(session=self.session)))
+
+    def llm(self, role: str):
+        return RecordingLLM(super().llm(role), self.cassette)
+
+def replay_services(cassette: Cassette, latency: Latency) -> Services:
+    # LLM calls go over HTTP to the stub server, so the real client, retry and rate-limit code still runs.
+    return Services(
+        router=LLMRouter(routes={"default": "local:replay"}),
+        search=CassetteSearch(cassette, latency=latency),
+        http_pool=CassetteHttpPool(cassette, record=False, latency=latency),
+    )
+
+class ReplayReplies:
+    # Reply callable for StubLLMServer that serves the current goal's cassette.
+    def __init__(self, latency: Latency):
+        self.latency = latency
+        self.cassette: Optional[Cassette] = None
+
+    def __call__(self, messages, request) -> str:
+        key = Cassette.key("llm", llm_request(messages, request.get("temperature"), request.get("max_tokens"), request.get("response_format")))
+        try:
+            entry = self.cassette.get(key)
+        except MissingFixture:
+            print(f"[Benchmark] No recorded LLM response for {key}; the recording is stale, re-run with --record.")
+            return ""
+        time.sleep(self.latency(entry["latency"]))
+        return entry["response"]
+
+def run_goal(goal: Dict[str, Any], services: Services, output_root: str) -> Dict[str, Any]:
+    output_dir = os.path.join(output_root, goal["id"])
+    # Existing files change the Coder's prompts, so every run starts from an empty directory.
+    shutil.rmtree(output_dir, ignore_errors=True)
+    tracer.enable()
+    manager, planner = build_manager(output_dir=output_dir, services=services)
+    start = time.perf_counter()
+    manager.start_task(goal["goal"], planner.name)
+    wall = time.perf_counter() - start
+    spans = list(tracer.spans)
+    llm_spans = [span for span in spans if span["cat"] == "llm"]
+    return {
+        "status": "finished" if planner.finished else "incomplete",
+        "wall_s": round(wall, 2),
+        "llm_calls": manager.llm_budget.used,
+        "prompt_tokens": sum(span["args"].get("prompt_tokens") or 0 for span in llm_spans),
+        "completion_tokens": sum(span["args"].get("completion_tokens") or 0 for span in llm_spans),
+        "revisions": sum(planner.revision_counts.values()),
+        "agent_hops": sum(1 for span in spans if span["cat"] == "message"),
+    }
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    header = f"{'goal':<18} {'metric':<18} {'baseline':>10} {'current':>10} {'change':>8}"
+    lines, regressions = [header, "-" * len(header)], []
+    for goal_id, metrics in results.items():
+        base = baseline.get(goal_id)
+        if not base:
+            lines.append(f"{goal_id:<18} (no baseline)")
+            continue
+        for metric in METRICS:
+            old, new = base.get(metric), metrics.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else (0.0 if new == old else float("inf"))
+            flag = ""
+            if change > tolerance:
+                flag = "  REGRESSION"
+                regressions.append(f"{goal_id} {metric}")
+            lines.append(f"{goal_id:<18} {metric:<18} {old:>10} {new:>10} {change:>+8.0%}{flag}")
+    print("\n".join(lines))
+    return regressions
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the agent pipeline against recorded LLM, search and HTTP traffic.")
+    parser.add_argument("--record", action="store_true", help="Call the real APIs and (re)write the fixtures.")
+    parser.add_argument("--goals", help="JSONL file of goals to run instead of the built-in suite.")
+    parser.add_argument("--only", nargs="*", help="Run only these goal ids.")
+    parser.add_argument("--fixtures", default="benchmarks/fixtures", help="Directory with one recording per goal.")
+    parser.add_argument("--output", default="output/benchmarks", help="Where the generated sites are written.")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Replay each call with its recorded latency times this factor.")
+    parser.add_argument("--fixed-latency", type=float, help="Replay every call with this latency in seconds instead.")
+    parser.add_argument("--baseline", default="benchmarks/baseline.json", help="Stored metrics to compare against.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run's metrics as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Relative increase that counts as a regression.")
+    return parser.parse_args()
+
+def main() -> int:
+    args = parse_args()
+    # The on-disk LLM cache would hide the cost of every call being measured, and a search cache hit
+    # would be recorded as if it were Brave's real latency.
+    os.environ["LLM_CACHE"] = "off"
+    if args.record:
+        os.environ["BRAVE_CACHE"] = "off"
+    goals = load_goals(args.goals) if args.goals else DEFAULT_GOALS
+    if args.only:
+        goals = [goal for goal in goals if goal["id"] in args.only]
+    latency = Latency(args.latency_scale, args.fixed_latency)
+    replies = ReplayReplies(latency)
+
+    stub = None
+    if not args.record:
+        stub = StubLLMServer(port=0, reply=replies).start()
+        os.environ["LOCAL_BASE_URL"] = stub.base_url
+
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        for goal in goals:
+            cassette = Cassette(os.path.join(args.fixtures, f"{goal['id']}.json"))
+            if args.record:
+                services = RecordingServices(cassette)
+            elif not len(cassette):
+                print(f"[Benchmark] No fixture for '{goal['id']}'; record one with --record. Skipping.")
+                continue
+            else:
+                replies.cassette = cassette
+                services = replay_services(cassette, latency)
+            print(f"[Benchmark] Running '{goal['id']}' ({'record' if args.record else 'replay'}).")
+            results[goal["id"]] = run_goal(goal, services, args.output)
+            results[goal["id"]]["fixture_misses"] = cassette.misses
+            if args.record:
+                cassette.save()
+                print(f"[Benchmark] Recorded {len(cassette)} interactions to {cassette.path}.")
+    finally:
+        if stub:
+            stub.stop()
+
+    print(json.dumps(results, indent=2))
+    if args.save_baseline:
+        baseline = load_checkpoint(args.baseline) or {}
+        baseline.update(results)
+        save_checkpoint(args.baseline, baseline)
+        print(f"[Benchmark] Saved baseline to {args.baseline}.")
+        return 0
+    baseline = load_checkpoint(args.baseline)
+    if not baseline:
+        print(f"[Benchmark] No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"[Benchmark] {len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
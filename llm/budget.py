@@ -0,0 +1,24 @@
+import threading
+from typing import Optional
+
+class BudgetExhaustedError(RuntimeError):
+    pass
+
+class CallBudget:
+    # Shared cap on LLM API calls for a run; None means unlimited.
+    def __init__(self, max_calls: Optional[int] = None):
+        self.max_calls = max_calls
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.max_calls is not None and self.used >= self.max_calls:
+                return False
+            self.used += 1
+            return True
+
+    @property
+    def exhausted(self) -> bool:
+        with self._lock:
+            return self.max_calls is not None and self.used >= self.max_calls
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from tools.file_tools import atomic_write
+
+class LLMCache:
+    def __init__(self, cache_dir: str = ".llm_cache", max_bytes: int = 64 * 1024 * 1024, bypass_sampled: bool = False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        # When set, calls with temperature > 0 always go to the API.
+        self.bypass_sampled = bypass_sampled
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._load_index()
+
+    @classmethod
+    def from_env(cls) -> Optional["LLMCache"]:
+        if os.getenv("LLM_CACHE", "on").lower() in ("0", "off", "false", "no"):
+            return None
+        return cls(
+            cache_dir=os.getenv("LLM_CACHE_DIR", ".llm_cache"),
+            max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB", "64")) * 1024 * 1024),
+            bypass_sampled=os.getenv("LLM_CACHE_BYPASS_SAMPLED", "off").lower() in ("1", "on", "true", "yes"),
+        )
+
+    def make_key(self, model: str, messages: List[Dict[str, Any]], temperature: float, max_tokens: int, response_format: Any) -> str:
+        payload = json.dumps(
+            {
+                "model": model,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+                "response_format": response_format,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def should_bypass(self, temperature: float) -> bool:
+        return self.bypass_sampled and temperature > 0
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry.get("response")
+
+    def put(self, key: str, response: str):
+        data = json.dumps({"created": time.time(), "response": response}, ensure_ascii=False)
+        try:
+            atomic_write(self._path(key), [data])
+        except OSError as e:
+            print(f"[LLMCache] Failed to store cache entry: {e}")
+            return
+        size = len(data.encode("utf-8"))
+        with self._lock:
+            self._total_bytes -= self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._total_bytes += size
+            self._evict()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _load_index(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        found = []
+        for name in os.listdir(self.cache_dir):
+            # Temp files left by an interrupted write start with "."; they are not entries.
+            if name.startswith(".") or not name.endswith(".json"):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, name))
+            found.append((stat.st_mtime, name[:-len(".json")], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+        with self._lock:
+            self._evict()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
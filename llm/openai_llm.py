@@ -1,26 +1,130 @@
 import os
+from contextlib import nullcontext
+from typing import Optional
 from openai import OpenAI
-from dotenv import load_dotenv
+from llm.llm_cache import LLMCache
+from llm.budget import BudgetExhaustedError, CallBudget
+from llm.rate_limit import RateLimiter
+from llm.resilience import ResilientCaller
+from tracing import span
+
+DASHSCOPE_BASE_URL = "https://dashscope.aliyuncs.com/compatible-mode/v1"
+
+def make_client(base_url: Optional[str] = None, api_key: Optional[str] = None) -> OpenAI:
+    return OpenAI(
+        api_key = api_key or os.getenv("OPENAI_API_KEY"),
+        base_url=base_url or DASHSCOPE_BASE_URL,
+        # Retries are handled by ResilientCaller so backoff, hedging and the breaker see every attempt.
+        max_retries=0,
+    )
 
 class OpenAILLM:
-    def __init__(self):
-        load_dotenv()
-        self.model = os.getenv("OPENAI_MODEL")
-        self.client = OpenAI(
-            api_key = os.getenv("OPENAI_API_KEY"),
-            base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
-        )
+    def __init__(self, cache: Optional[LLMCache] = None, caller: Optional[ResilientCaller] = None, model: Optional[str] = None, base_url: Optional[str] = None, api_key: Optional[str] = None, limiter: Optional[RateLimiter] = None, client: Optional[OpenAI] = None):
+        self.model = model or os.getenv("OPENAI_MODEL")
+        self.client = client or make_client(base_url, api_key)
+        self.cache = cache if cache is not None else LLMCache.from_env()
+        self.caller = caller or ResilientCaller.from_env()
+        self.budget: Optional[CallBudget] = None
+        self.limiter = limiter
 
     def generate_completion(self, messages, temperature=0.7, max_tokens=2048, response_format=None):
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                response_format=response_format,
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            print(f"Error calling OpenAI API: {e}")
-            return None
+        with span("llm.generate_completion", "llm", model=self.model) as trace:
+            cache_key = None
+            if self.cache and not self.cache.should_bypass(temperature):
+                cache_key = self.cache.make_key(self.model, messages, temperature, max_tokens, response_format)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    trace["cache_hit"] = True
+                    return cached
+
+            try:
+                def create():
+                    with self._slot():
+                        return self.client.chat.completions.create(
+                            model=self.model,
+                            messages=messages,
+                            temperature=temperature,
+                            max_tokens=max_tokens,
+                            response_format=response_format,
+                            timeout=self.caller.timeout,
+                        )
+
+                response = self.caller.call(create, trace, admit=self._spend_budget)
+                content = response.choices[0].message.content
+                self._record_usage(trace, response.usage)
+            except BudgetExhaustedError as e:
+                print(f"{e}; skipping call.")
+                return None
+            except Exception as e:
+                print(f"Error calling OpenAI API: {e}")
+                trace["error"] = str(e)
+                return None
+
+            if cache_key and content is not None:
+                self.cache.put(cache_key, content)
+            return content
+
+    def stream_completion(self, messages, temperature=0.7, max_tokens=2048, response_format=None):
+        with span("llm.stream_completion", "llm", model=self.model) as trace:
+            cache_key = None
+            if self.cache and not self.cache.should_bypass(temperature):
+                cache_key = self.cache.make_key(self.model, messages, temperature, max_tokens, response_format)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    trace["cache_hit"] = True
+                    yield cached
+                    return
+
+            parts = []
+            # The slot is held for the whole stream, since that is how long the request is in flight.
+            with self._slot():
+                try:
+                    # Only opening the stream is retried; chunks already handed to the caller can't be taken back.
+                    stream = self.caller.call(lambda: self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        response_format=response_format,
+                        stream=True,
+                        stream_options={"include_usage": True},
+                        timeout=self.caller.timeout,
+                    ), trace, hedge=False, admit=self._spend_budget)
+                    for chunk in stream:
+                        if getattr(chunk, "usage", None):
+                            self._record_usage(trace, chunk.usage)
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            if cache_key:
+                                parts.append(delta)
+                            yield delta
+                except BudgetExhaustedError:
+                    raise
+                except Exception as e:
+                    print(f"Error streaming from OpenAI API: {e}")
+                    raise
+
+            if cache_key and parts:
+                self.cache.put(cache_key, "".join(parts))
+
+    def _spend_budget(self):
+        # Called by the ResilientCaller only once the breaker lets the call through, so rejected calls cost nothing.
+        if self.budget and not self.budget.try_acquire():
+            raise BudgetExhaustedError(f"LLM call budget of {self.budget.max_calls} calls exhausted")
+
+    def _slot(self):
+        return self.limiter.slot() if self.limiter else nullcontext()
+
+    def _record_usage(self, trace, usage):
+        if usage is None:
+            return
+        trace["prompt_tokens"] = getattr(usage, "prompt_tokens", None)
+        trace["completion_tokens"] = getattr(usage, "completion_tokens", None)
+        # Prompt tokens the provider served from its prefix cache; see agents/prompts.py.
+        details = getattr(usage, "prompt_tokens_details", None)
+        if isinstance(details, dict):
+            trace["cached_tokens"] = details.get("cached_tokens")
+        elif details is not None:
+            trace["cached_tokens"] = getattr(details, "cached_tokens", None)
@@ -0,0 +1,43 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+class RateLimiter:
+    # Process-wide cap on in-flight LLM requests and on requests per minute, shared by every run.
+    def __init__(self, max_concurrent: Optional[int] = None, requests_per_minute: Optional[float] = None):
+        self.max_concurrent = max_concurrent
+        self.requests_per_minute = requests_per_minute
+        self._slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        max_concurrent = int(os.getenv("LLM_MAX_CONCURRENCY", "0")) or None
+        requests_per_minute = float(os.getenv("LLM_RPM", "0")) or None
+        return cls(max_concurrent, requests_per_minute)
+
+    @contextmanager
+    def slot(self):
+        if self._slots:
+            self._slots.acquire()
+        try:
+            self._wait_for_turn()
+            yield
+        finally:
+            if self._slots:
+                self._slots.release()
+
+    def _wait_for_turn(self):
+        # Spaces request starts evenly at 60 / rpm seconds apart.
+        if not self.requests_per_minute:
+            return
+        interval = 60.0 / self.requests_per_minute
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + interval
+        if start > now:
+            time.sleep(start - now)
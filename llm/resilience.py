@@ -0,0 +1,161 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+RETRYABLE_ERROR_NAMES = {"APITimeoutError", "APIConnectionError", "RateLimitError", "InternalServerError", "Timeout", "ConnectionError"}
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+def is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES or status >= 500
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES or isinstance(error, (TimeoutError, ConnectionError))
+
+class RetryPolicy:
+    def __init__(self, max_attempts: int = 4, base_delay: float = 1.0, max_delay: float = 20.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        # Exponential backoff with full jitter.
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+class CircuitBreaker:
+    # Opens after failure_threshold consecutive failures; after reset_timeout one trial call is let through.
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def release(self):
+        # Frees the trial slot of a call that never went out, or whose error says nothing about the upstream.
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+class LatencyTracker:
+    def __init__(self, window: int = 100, min_samples: int = 10):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+class ResilientCaller:
+    def __init__(self, retry_policy: RetryPolicy = None, breaker: CircuitBreaker = None, hedge: bool = False, hedge_min_delay: float = 2.0, timeout: float = 120.0):
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.timeout = timeout
+        self.latency = LatencyTracker()
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge") if hedge else None
+
+    @classmethod
+    def from_env(cls) -> "ResilientCaller":
+        return cls(
+            retry_policy=RetryPolicy(max_attempts=int(os.getenv("LLM_MAX_ATTEMPTS", "4"))),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("LLM_BREAKER_RESET", "30")),
+            ),
+            hedge=os.getenv("LLM_HEDGE", "off").lower() in ("1", "on", "true", "yes"),
+            timeout=float(os.getenv("LLM_TIMEOUT", "120")),
+        )
+
+    def call(self, fn: Callable[[], T], trace: Dict[str, Any] = None, hedge: bool = True, admit: Optional[Callable[[], None]] = None) -> T:
+        # `admit` runs once the breaker has let the call through (e.g. to spend the run's call budget); if it raises, the call is not made.
+        trace = trace if trace is not None else {}
+        if not self.breaker.allow():
+            raise CircuitOpenError("LLM circuit breaker is open after repeated failures")
+        if admit is not None:
+            try:
+                admit()
+            except Exception:
+                self.breaker.release()
+                raise
+
+        for attempt in range(self.retry_policy.max_attempts):
+            trace["attempts"] = attempt + 1
+            start = time.monotonic()
+            try:
+                result = self._call_hedged(fn, trace) if hedge and self.hedge else fn()
+            except Exception as e:
+                retryable = is_retryable(e)
+                if attempt + 1 >= self.retry_policy.max_attempts or not retryable:
+                    # Only upstream trouble (timeouts, 5xx, 429) opens the breaker; a 400 is the request's fault.
+                    if retryable:
+                        self.breaker.record_failure()
+                    else:
+                        self.breaker.release()
+                    raise
+                delay = self.retry_policy.delay(attempt)
+                print(f"[ResilientCaller] attempt {attempt + 1} failed ({type(e).__name__}: {e}); retrying in {delay:.1f}s.")
+                time.sleep(delay)
+                continue
+            self.latency.record(time.monotonic() - start)
+            self.breaker.record_success()
+            return result
+
+    def _call_hedged(self, fn: Callable[[], T], trace: Dict[str, Any]) -> T:
+        # Fire a duplicate once the first request is slower than the recent p95 and take whichever finishes first.
+        p95 = self.latency.p95()
+        primary = self._executor.submit(fn)
+        if p95 is None:
+            return primary.result()
+        done, _ = wait([primary], timeout=max(self.hedge_min_delay, p95))
+        if done:
+            return primary.result()
+        trace["hedged"] = True
+        pending = {primary, self._executor.submit(fn)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
@@ -0,0 +1,148 @@
+import os
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+from openai import OpenAI
+from llm.budget import CallBudget
+from llm.llm_cache import LLMCache
+from llm.openai_llm import DASHSCOPE_BASE_URL, OpenAILLM, make_client
+from llm.rate_limit import RateLimiter
+from llm.resilience import ResilientCaller
+
+# Built-in providers as (base_url, env var holding the API key). Any provider can be added or
+# overridden with <NAME>_BASE_URL and <NAME>_API_KEY, e.g. DEEPSEEK_BASE_URL / DEEPSEEK_API_KEY.
+PROVIDERS = {
+    "dashscope": (DASHSCOPE_BASE_URL, "OPENAI_API_KEY"),
+    "openai": ("https://api.openai.com/v1", "OPENAI_API_KEY"),
+    "local": ("http://127.0.0.1:8765/v1", None),
+}
+
+# Routes that default to the fast model (OPENAI_FAST_MODEL) when no LLM_ROUTE_* variable is set.
+FAST_ROUTES = {"evaluator", "planner_summary"}
+
+Route = List[Tuple[str, str]]
+
+def parse_route(spec: str, default_provider: str = "dashscope") -> Route:
+    # "dashscope:qwen-max, local:stub" -> [("dashscope", "qwen-max"), ("local", "stub")]
+    route = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        provider, sep, model = entry.partition(":")
+        if not sep:
+            provider, model = default_provider, entry
+        route.append((provider.strip().lower(), model.strip()))
+    return route
+
+class LLMRouter:
+    # Picks provider and model per agent role and task type, e.g. LLM_ROUTE_EVALUATOR=dashscope:qwen-turbo.
+    # A route may list several candidates; later ones are only used when earlier ones fail.
+    def __init__(self, routes: Optional[Dict[str, str]] = None, fallback: str = "", cache: Optional[LLMCache] = None, limiter: Optional[RateLimiter] = None):
+        self.routes = {key.lower(): parse_route(spec) for key, spec in (routes or {}).items()}
+        self.fallback = parse_route(fallback)
+        self.cache = cache if cache is not None else LLMCache.from_env()
+        # Shared by every LLM the router hands out, so concurrent runs respect one global limit.
+        self.limiter = limiter or RateLimiter.from_env()
+        # One ResilientCaller and one OpenAI client (connection pool) per provider, shared by every agent.
+        self._callers: Dict[str, ResilientCaller] = {}
+        self._clients: Dict[str, OpenAI] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "LLMRouter":
+        prefix = "LLM_ROUTE_"
+        routes = {key[len(prefix):]: value for key, value in os.environ.items() if key.startswith(prefix) and value.strip()}
+        return cls(routes=routes, fallback=os.getenv("LLM_FALLBACK", ""))
+
+    def route(self, role: str, task_type: Optional[str] = None) -> Route:
+        role = role.lower()
+        keys = ([f"{role}_{task_type.lower()}"] if task_type else []) + [role]
+        for key in keys:
+            if key in self.routes:
+                return self._with_fallback(self.routes[key])
+        if "default" in self.routes:
+            return self._with_fallback(self.routes["default"])
+        model = os.getenv("OPENAI_MODEL")
+        if any(key in FAST_ROUTES for key in keys):
+            model = os.getenv("OPENAI_FAST_MODEL") or model
+        return self._with_fallback([("dashscope", model)])
+
+    def _with_fallback(self, route: Route) -> Route:
+        return route + [candidate for candidate in self.fallback if candidate not in route]
+
+    def make_llm(self, provider: str, model: str) -> OpenAILLM:
+        base_url, key_env = PROVIDERS.get(provider, (None, None))
+        base_url = os.getenv(f"{provider.upper()}_BASE_URL") or base_url
+        if not base_url:
+            raise ValueError(f"Unknown LLM provider '{provider}': set {provider.upper()}_BASE_URL")
+        api_key = os.getenv(f"{provider.upper()}_API_KEY") or (os.getenv(key_env) if key_env else None) or "none"
+        with self._lock:
+            if provider not in self._callers:
+                self._callers[provider] = ResilientCaller.from_env()
+                self._clients[provider] = make_client(base_url, api_key)
+            caller, client = self._callers[provider], self._clients[provider]
+        return OpenAILLM(cache=self.cache, caller=caller, model=model, limiter=self.limiter, client=client)
+
+    def for_role(self, role: str) -> "RoutedLLM":
+        return RoutedLLM(self, role)
+
+class RoutedLLM:
+    # Drop-in replacement for OpenAILLM that resolves the route on every call; pass task_type to pick a sub-route.
+    def __init__(self, router: LLMRouter, role: str):
+        self.router = router
+        self.role = role
+        self._budget: Optional[CallBudget] = None
+        self._llms: Dict[Tuple[str, str], OpenAILLM] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def model(self) -> str:
+        return self.router.route(self.role)[0][1]
+
+    @property
+    def budget(self) -> Optional[CallBudget]:
+        return self._budget
+
+    @budget.setter
+    def budget(self, budget: Optional[CallBudget]):
+        with self._lock:
+            self._budget = budget
+            for llm in self._llms.values():
+                llm.budget = budget
+
+    def _candidates(self, task_type: Optional[str]) -> Iterator[OpenAILLM]:
+        for provider, model in self.router.route(self.role, task_type):
+            with self._lock:
+                llm = self._llms.get((provider, model))
+                if llm is None:
+                    llm = self._llms[(provider, model)] = self.router.make_llm(provider, model)
+                    llm.budget = self._budget
+            yield llm
+
+    def generate_completion(self, messages, temperature=0.7, max_tokens=2048, response_format=None, task_type=None):
+        for llm in self._candidates(task_type):
+            content = llm.generate_completion(messages, temperature=temperature, max_tokens=max_tokens, response_format=response_format)
+            if content is not None:
+                return content
+            if self._budget and self._budget.exhausted:
+                return None
+            print(f"[LLMRouter] {self.role}/{task_type or 'default'}: {llm.model} failed, trying the next provider.")
+        return None
+
+    def stream_completion(self, messages, temperature=0.7, max_tokens=2048, response_format=None, task_type=None):
+        # Falls back only while nothing has been yielded; a stream that breaks midway is re-raised.
+        error = None
+        for llm in self._candidates(task_type):
+            started = False
+            try:
+                for chunk in llm.stream_completion(messages, temperature=temperature, max_tokens=max_tokens, response_format=response_format):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                if started or (self._budget and self._budget.exhausted):
+                    raise
+                error = e
+                print(f"[LLMRouter] {self.role}/{task_type or 'default'}: {llm.model} failed ({e}), trying the next provider.")
+        if error is not None:
+            raise error
@@ -0,0 +1,152 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Union
+
+# Local OpenAI-compatible endpoint for tests and offline runs. Point a route at it with
+# LLM_ROUTE_DEFAULT=local:stub (LOCAL_BASE_URL defaults to http://127.0.0.1:8765/v1).
+
+Reply = Union[str, Callable[[List[Dict[str, Any]], Dict[str, Any]], str]]
+
+def default_reply(messages: List[Dict[str, Any]], request: Dict[str, Any]) -> str:
+    if (request.get("response_format") or {}).get("type") == "json_object":
+        return json.dumps({"status": "approved", "feedback": "Stub evaluation."})
+    return f"stub reply from {request.get('model')}"
+
+class StubLLMServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, reply: Reply = default_reply, fail_status: Optional[int] = None, delay: float = 0.0):
+        self.reply = reply
+        # When set, every completion request is answered with this HTTP status, e.g. 503 to exercise fallback.
+        self.fail_status = fail_status
+        self.delay = delay
+        self.requests: List[Dict[str, Any]] = []
+        # System prompts seen so far, used to report prefix-cache hits like a real provider.
+        self._seen_prefixes = set()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _complete(self, request: Dict[str, Any]) -> str:
+        messages = request.get("messages", [])
+        return self.reply(messages, request) if callable(self.reply) else self.reply
+
+    def _cached_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        if not messages or messages[0].get("role") != "system":
+            return 0
+        prefix = str(messages[0].get("content", ""))
+        if prefix in self._seen_prefixes:
+            return len(prefix) // 4
+        self._seen_prefixes.add(prefix)
+        return 0
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json(200, {"object": "list", "data": [{"id": "stub", "object": "model"}]})
+                else:
+                    self._send_json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+                stub.requests.append(request)
+                if stub.delay:
+                    time.sleep(stub.delay)
+                if stub.fail_status:
+                    self._send_json(stub.fail_status, {"error": {"message": f"stub failure {stub.fail_status}"}})
+                    return
+                content = stub._complete(request)
+                usage = {
+                    "prompt_tokens": sum(len(str(message.get("content", ""))) for message in request.get("messages", [])) // 4,
+                    "completion_tokens": len(content) // 4,
+                }
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                usage["prompt_tokens_details"] = {"cached_tokens": stub._cached_tokens(request.get("messages", []))}
+                if request.get("stream"):
+                    self._send_stream(request, content, usage)
+                else:
+                    self._send_json(200, {
+                        "id": "chatcmpl-stub",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": request.get("model"),
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                        "usage": usage,
+                    })
+
+            def _send_json(self, status: int, body: Dict[str, Any]):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, request: Dict[str, Any], content: str, usage: Dict[str, int]):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                base = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()), "model": request.get("model")}
+                for i in range(0, len(content), 16):
+                    chunk = dict(base, choices=[{"index": 0, "delta": {"content": content[i:i + 16]}, "finish_reason": None}])
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.write(f"data: {json.dumps(dict(base, choices=[{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]))}\n\n".encode("utf-8"))
+                if (request.get("stream_options") or {}).get("include_usage"):
+                    self.wfile.write(f"data: {json.dumps(dict(base, choices=[], usage=usage))}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local OpenAI-compatible stub for tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--reply", help="Fixed text returned for every completion.")
+    parser.add_argument("--fail-status", type=int, help="Answer every completion with this HTTP status.")
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before answering.")
+    args = parser.parse_args()
+    server = StubLLMServer(args.host, args.port, reply=args.reply or default_reply, fail_status=args.fail_status, delay=args.delay)
+    print(f"[StubLLMServer] serving on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+_encoding = None
+
+def count_tokens(text: str) -> int:
+    # Uses tiktoken when it is installed. Otherwise ASCII runs ~4 characters per token and every other
+    # character (CJK especially) counts as about one token, which is close enough for budgeting.
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text, disallowed_special=()))
+    non_ascii = sum(1 for char in text if ord(char) > 127)
+    return (len(text) - non_ascii + 3) // 4 + non_ascii
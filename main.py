@@ -1,22 +1,11 @@
-from agent_manager import AgentManager
-from agents.planner_agent import PlannerAgent
-from agents.coder_agent import CoderAgent
-from agents.evaluator_agent import EvaluatorAgent
-from agents.search_agent import SearchAgent
+import argparse
+from llm.rate_limit import RateLimiter
+from services import services
+from tools.site_build import build_site
+from tracing import tracer
+from workflow import BatchRunner, build_manager, load_goals
 
-def main():
-    manager = AgentManager()
-    planner = PlannerAgent()
-    coder = CoderAgent()
-    evaluator = EvaluatorAgent()
-    searcher = SearchAgent()
-
-    manager.add_agent(planner)
-    manager.add_agent(coder)
-    manager.add_agent(evaluator)
-    manager.add_agent(searcher)
-
-    initial_goal = """请生成一个arxivcs Daily网页，核心功能:
+INITIAL_GOAL = """请生成一个arxivcs Daily网页，核心功能:
             1.需要存储论文数据，比如存储在data.js文件中, 至少5条以上, 其中分类请用缩写,例如cs.AI, 其中id请用pdf_url的后缀, 例如https://arxiv.org/pdf/2405.12345.pdf中使用2405.12345作为id, 并且前端代码需要引用这个数据文件来展示数据。
             2.script.js文件:负责加载并渲染data.js中的数据，其他html文件会引用script.js中的方法;
             3.一个首页比如index.html，有论文列表， 其中列出arxiv核心CS分类，点击具体分类后会带上参数,例如?cat=cs.AI以跳转到category.html页面, 实现筛选论文列表的功能;
@@ -33,9 +22,58 @@ def main():
             - 对data.js文件中的论文数据，请使用API获取，例如https://export.arxiv.org/api/query?search_query=cat:cs.AI&sortBy=lastUpdatedDate&sortOrder=descending&max_results=2获取cs.AI分类下的论文, 其他分类例如cs.RO就把cs.AI替换成cs.RO以此类推， 我需要data.js里面有cs.AI, cs.RO, cs.CV这三个分类各2篇
         The entire project should be in an "output/arxiv_cs_daily' directory.
     """
-    
-    print("\nStarting multi-agent workflow...")
-    manager.start_task(initial_goal, planner.name)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the multi-agent code generation workflow.")
+    parser.add_argument("--checkpoint", default=".checkpoints/planner.json", help="Where the Planner saves its state after every step.")
+    parser.add_argument("--resume", action="store_true", help="Continue the run saved in --checkpoint instead of starting from the goal.")
+    parser.add_argument("--trace-dir", help="Record spans for agent hops, LLM, search and API calls and write them to this directory.")
+    parser.add_argument("--batch", help="Run every goal in this JSONL file (one {\"id\": ..., \"goal\": ...} per line) instead of the built-in goal.")
+    parser.add_argument("--batch-output", default="output/batch", help="Each batch goal writes its files to a subdirectory of this directory.")
+    parser.add_argument("--report", default="output/batch/report.jsonl", help="Where batch mode writes one JSON result per goal.")
+    parser.add_argument("--parallel-goals", type=int, default=4, help="How many batch goals run at the same time.")
+    parser.add_argument("--max-llm-calls", type=int, default=100, help="LLM API calls one run may make (per goal in batch mode); a goal's own max_llm_calls wins.")
+    parser.add_argument("--llm-concurrency", type=int, help="Maximum LLM requests in flight across all runs.")
+    parser.add_argument("--llm-rpm", type=float, help="Maximum LLM requests per minute across all runs.")
+    parser.add_argument("--build-site", help="After the run, shard, minify and fingerprint the site in this directory into <dir>/dist.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.trace_dir:
+        tracer.enable()
+
+    if args.llm_concurrency or args.llm_rpm:
+        services.router.limiter = RateLimiter(args.llm_concurrency, args.llm_rpm)
+
+    if args.batch:
+        runner = BatchRunner(output_root=args.batch_output, report_path=args.report, max_parallel_goals=args.parallel_goals, max_llm_calls=args.max_llm_calls)
+        results = runner.run(load_goals(args.batch), resume=args.resume)
+        finished = sum(1 for result in results if result.get("status") == "finished")
+        print(f"\n[Batch] {finished}/{len(results)} goals finished. Report: {args.report}")
+        if args.trace_dir:
+            tracer.write(args.trace_dir)
+            print(tracer.summary())
+        return
+
+    manager, planner = build_manager(checkpoint_path=args.checkpoint, max_llm_calls=args.max_llm_calls)
+
+    if args.resume:
+        print("\nResuming multi-agent workflow from checkpoint...")
+        manager.resume_task(planner.name)
+    else:
+        print("\nStarting multi-agent workflow...")
+        manager.start_task(INITIAL_GOAL, planner.name)
+
+    if args.build_site:
+        try:
+            build_site(args.build_site)
+        except ValueError as e:
+            print(f"[SiteBuild] {e}")
+
+    if args.trace_dir:
+        tracer.write(args.trace_dir)
+        print(tracer.summary())
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Handler = Callable[[], Any]
+
+class MessageBus:
+    # Every hop goes back through the event loop, so the call stack stays flat.
+    # Each mailbox is drained on worker threads, one message at a time unless the agent
+    # registered a higher concurrency; different agents always run concurrently.
+    def __init__(self, max_workers: Optional[int] = None):
+        self.mailboxes: Dict[str, asyncio.Queue] = {}
+        self.concurrency: Dict[str, int] = {}
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._backlog: List[Tuple[str, Handler]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._workers: List[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def register(self, recipient: str, concurrency: int = 1):
+        self.concurrency[recipient] = max(1, concurrency)
+
+    def post(self, recipient: str, handler: Handler):
+        with self._lock:
+            self._pending += 1
+            loop = self._loop
+            if loop is None:
+                self._backlog.append((recipient, handler))
+                return
+        loop.call_soon_threadsafe(self._enqueue, recipient, handler)
+
+    def run_until_idle(self):
+        asyncio.run(self._run())
+
+    async def _run(self):
+        max_workers = self.max_workers or max(1, sum(self.concurrency.values()))
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent")
+        self._idle = asyncio.Event()
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            backlog, self._backlog = self._backlog, []
+            idle = self._pending == 0
+        try:
+            for recipient, handler in backlog:
+                self._enqueue(recipient, handler)
+            if not idle:
+                await self._idle.wait()
+        finally:
+            with self._lock:
+                self._loop = None
+            for worker in self._workers:
+                worker.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers = []
+            self.mailboxes = {}
+            self._executor.shutdown(wait=True)
+
+    def _enqueue(self, recipient: str, handler: Handler):
+        mailbox = self.mailboxes.get(recipient)
+        if mailbox is None:
+            mailbox = self.mailboxes[recipient] = asyncio.Queue()
+            for _ in range(self.concurrency.get(recipient, 1)):
+                self._workers.append(asyncio.create_task(self._drain(recipient, mailbox)))
+        mailbox.put_nowait(handler)
+
+    async def _drain(self, recipient: str, mailbox: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            handler = await mailbox.get()
+            try:
+                await loop.run_in_executor(self._executor, handler)
+            except Exception as e:
+                print(f"[MessageBus] Error while '{recipient}' handled a message: {e}")
+            finally:
+                self._done()
+
+    def _done(self):
+        with self._lock:
+            self._pending -= 1
+            idle = self._pending == 0
+        if idle:
+            self._idle.set()
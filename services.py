@@ -0,0 +1,56 @@
+import threading
+from typing import Any, Callable, Optional
+import requests
+from dotenv import load_dotenv
+from llm.router import LLMRouter, RoutedLLM
+from tools.brave_search import BraveSearch
+from tools.http_pool import HttpPool, shared_session
+
+_env_lock = threading.Lock()
+_env_loaded = False
+
+def load_env():
+    # .env is parsed once per process, before the first client is built; the clients only read os.environ.
+    global _env_loaded
+    with _env_lock:
+        if not _env_loaded:
+            load_dotenv()
+            _env_loaded = True
+
+class Services:
+    # Clients shared by every agent and run in the process. Each one is built on first use.
+    def __init__(self, router: Optional[LLMRouter] = None, search: Optional[BraveSearch] = None, session: Optional[requests.Session] = None, http_pool: Optional[HttpPool] = None):
+        self._router = router
+        self._search = search
+        self._session = session
+        self._http_pool = http_pool
+        self._lock = threading.RLock()
+
+    def _get(self, attr: str, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            if getattr(self, attr) is None:
+                load_env()
+                setattr(self, attr, factory())
+            return getattr(self, attr)
+
+    @property
+    def router(self) -> LLMRouter:
+        return self._get("_router", LLMRouter.from_env)
+
+    @property
+    def session(self) -> requests.Session:
+        return self._get("_session", shared_session)
+
+    @property
+    def search(self) -> BraveSearch:
+        return self._get("_search", lambda: BraveSearch(session=self.session))
+
+    @property
+    def http_pool(self) -> HttpPool:
+        return self._get("_http_pool", lambda: HttpPool(session=self.session))
+
+    def llm(self, role: str) -> RoutedLLM:
+        # Each agent gets its own RoutedLLM (and so its own call budget) over the shared clients.
+        return self.router.for_role(role)
+
+services = Services()
@@ -1,10 +1,16 @@
 import requests
 import json
+from tracing import span
 
-def api_tool(url: str, method: str = "GET", params: dict = None, data: dict = None) -> str:
-    try:
-        response = requests.request(method=method, url=url, params=params, json=data)
-        response.raise_for_status()
-        return response.text
-    except requests.exceptions.RequestException as e:
-        return f"An error occurred: {e}"
\ No newline at end of file
+def api_tool(url: str, method: str = "GET", params: dict = None, data: dict = None, session: requests.Session = None, timeout: float = 30.0) -> str:
+    with span("api_tool", "http", method=method, url=url) as trace:
+        try:
+            http = session or requests
+            response = http.request(method=method, url=url, params=params, json=data, timeout=timeout)
+            trace["status"] = response.status_code
+            trace["bytes"] = len(response.content)
+            response.raise_for_status()
+            return response.text
+        except requests.exceptions.RequestException as e:
+            trace["error"] = str(e)
+            return f"An error occurred: {e}"
@@ -1,19 +1,36 @@
 import os
 import requests
-from dotenv import load_dotenv
+from tools.http_pool import shared_session
+from tools.search_cache import SearchCache
+from tracing import span
 
 class BraveSearch:
-    def __init__(self):
-        load_dotenv()
+    def __init__(self, cache: SearchCache = None, session: requests.Session = None):
         self.api_key = os.getenv("BRAVE_API_KEY")
         if not self.api_key:
             raise ValueError("BRAVE_API_KEY not found in .env file")
         self.base_url = "https://api.search.brave.com/res/v1/web/search"
+        self.cache = cache if cache is not None else SearchCache.from_env()
+        self.session = session or shared_session()
 
     def search(self, query: str, num_results: int = 5):
         if not self.api_key or self.api_key == "your_brave_api_key_here":
             return "Error: Brave Search API key not configured."
-            
+
+        with span("brave.search", "search", query=query[:120]) as trace:
+            try:
+                if self.cache is None:
+                    return self._fetch(query, num_results)
+                key = SearchCache.make_key(query, num_results)
+                return self.cache.get_or_fetch(key, lambda: self._fetch(query, num_results))
+            except requests.exceptions.RequestException as e:
+                trace["error"] = str(e)
+                return f"Error calling Brave Search API: {e}"
+            except Exception as e:
+                trace["error"] = str(e)
+                return f"An unexpected error occurred: {e}"
+
+    def _fetch(self, query: str, num_results: int) -> str:
         headers = {
             "Accept": "application/json",
             "X-Subscription-Token": self.api_key,
@@ -22,21 +39,16 @@ class BraveSearch:
             "q": query,
             "count": num_results,
         }
-        try:
-            response = requests.get(self.base_url, headers=headers, params=params)
-            response.raise_for_status()
-            results = response.json()
-            
-            snippets = []
-            if "web" in results and "results" in results["web"]:
-                for result in results["web"]["results"]:
-                    snippets.append(f"Title: {result.get('title', 'N/A')}\n"
-                                    f"URL: {result.get('url', 'N/A')}\n"
-                                    f"Snippet: {result.get('description', 'N/A')}\n---")
-            
-            return "\n".join(snippets) if snippets else "No results found."
+        with span("brave.http", "search", query=query[:120]):
+            response = self.session.get(self.base_url, headers=headers, params=params, timeout=30)
+        response.raise_for_status()
+        results = response.json()
+
+        snippets = []
+        if "web" in results and "results" in results["web"]:
+            for result in results["web"]["results"]:
+                snippets.append(f"Title: {result.get('title', 'N/A')}\n"
+                                f"URL: {result.get('url', 'N/A')}\n"
+                                f"Snippet: {result.get('description', 'N/A')}\n---")
 
-        except requests.exceptions.RequestException as e:
-            return f"Error calling Brave Search API: {e}"
-        except Exception as e:
-            return f"An unexpected error occurred: {e}"
+        return "\n".join(snippets) if snippets else "No results found."
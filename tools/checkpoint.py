@@ -0,0 +1,18 @@
+import json
+from typing import Any, Dict, Optional
+from tools.file_tools import atomic_write
+
+def save_checkpoint(path: str, state: Dict[str, Any]):
+    # Written via rename so a crash mid-write never leaves a truncated checkpoint behind.
+    atomic_write(path, [json.dumps(state, ensure_ascii=False, default=str)])
+
+def load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def int_keys(mapping: Dict[str, Any]) -> Dict[Any, Any]:
+    # JSON turns integer task ids into strings; turn them back.
+    return {int(key) if str(key).lstrip("-").isdigit() else key: value for key, value in (mapping or {}).items()}
@@ -0,0 +1,53 @@
+import json
+import os
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Renders normalized API records (see response_normalizers) straight into a data file, one entry at
+# a time, so large data sets cost no LLM tokens and come out exactly as the API returned them.
+
+def iter_records(results: Iterable[Any]) -> Iterator[Dict[str, Any]]:
+    # Accepts normalized results ({"source", "records"}) or bare records; raw text is skipped. Records with an id seen before are dropped.
+    seen = set()
+    for result in results or []:
+        records = result.get("records") if isinstance(result, dict) and "records" in result else [result]
+        for record in records or []:
+            if not isinstance(record, dict):
+                continue
+            record_id = record.get("id")
+            if record_id:
+                if record_id in seen:
+                    continue
+                seen.add(record_id)
+            yield record
+
+def _select(record: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    return {field: record.get(field) for field in fields} if fields else record
+
+def _js_identifier(variable: str) -> str:
+    return variable if re.fullmatch(r"[A-Za-z_$][\w$]*", variable or "") else "papers"
+
+def render_records(records: Iterable[Dict[str, Any]], file_path: str, variable: str = "papers", fields: Optional[List[str]] = None) -> Iterator[str]:
+    # data.json gets a JSON array; anything else a script defining `var <variable> = [...]`.
+    # JSON is valid JavaScript, so every entry is serialized with json.dumps either way.
+    as_json = os.path.splitext(file_path)[1].lower() == ".json"
+    yield "[\n" if as_json else f"var {_js_identifier(variable)} = [\n"
+    first = True
+    for record in records:
+        yield ("" if first else ",\n") + "  " + json.dumps(_select(record, fields), ensure_ascii=False)
+        first = False
+    yield "\n]\n" if as_json else "\n];\n"
+
+def describe_records(records: List[Dict[str, Any]], file_path: str, variable: str = "papers", fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    # What code that consumes the file needs to know, without the data itself.
+    sample = dict(_select(records[0], fields)) if records else {}
+    if len(str(sample.get("abstract") or "")) > 200:
+        sample["abstract"] = sample["abstract"][:200].rstrip() + "..."
+    fields = fields or list(dict.fromkeys(field for record in records for field in record))
+    return {
+        "data_file": file_path,
+        "format": "json array" if file_path.lower().endswith(".json") else f"script defining the global `var {_js_identifier(variable)}`",
+        "count": len(records),
+        "fields": fields,
+        "sample": sample,
+    }
@@ -1,4 +1,17 @@
+import filecmp
+import hashlib
 import os
+import re
+import tempfile
+import time
+from typing import Iterable, List, Tuple
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def safe_name(text: str, fallback: str = "_") -> str:
+    # A single path component made only of characters every file system accepts.
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", text).strip("._") or fallback
 
 def read_file(file_path: str) -> str:
     try:
@@ -9,11 +22,82 @@ def read_file(file_path: str) -> str:
     except Exception as e:
         return f"Error reading file '{file_path}': {e}"
 
+def _existing_hash(file_path: str):
+    try:
+        with open(file_path, "r") as f:
+            return content_hash(f.read())
+    except (OSError, UnicodeDecodeError):
+        return None
+
+def stage_write(file_path: str, chunks: Iterable[str]) -> Tuple[str, str]:
+    # Writes the chunks to a temp file next to the target as they arrive, so memory stays flat however
+    # large the file is. Returns the temp path and the content hash; commit_write() puts it in place.
+    directory = os.path.dirname(file_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(file_path))
+    try:
+        digest = hashlib.sha256()
+        with os.fdopen(fd, "w") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                f.flush()
+                digest.update(chunk.encode("utf-8"))
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path, digest.hexdigest()
+
+def sweep_temp_files(directory: str, max_age: float = 300) -> List[str]:
+    # Removes ".tmp-" files that a crashed write left behind. A live stream touches its temp file with
+    # every chunk, so one untouched for max_age seconds has no writer any more.
+    removed = []
+    try:
+        names = os.listdir(directory or ".")
+    except OSError:
+        return removed
+    cutoff = time.time() - max_age
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            if name.startswith(".tmp-") and os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed.append(path)
+        except OSError:
+            pass
+    return removed
+
+def same_file_content(path_a: str, path_b: str) -> bool:
+    # Compares in small blocks, and not at all when the sizes differ.
+    try:
+        return filecmp.cmp(path_a, path_b, shallow=False)
+    except OSError:
+        return False
+
+def commit_write(tmp_path: str, file_path: str):
+    # mkstemp creates the file as 0600; keep the target readable like a plain open() would.
+    os.chmod(tmp_path, os.stat(file_path).st_mode & 0o777 if os.path.exists(file_path) else 0o644)
+    os.replace(tmp_path, file_path)
+
+def atomic_write(file_path: str, chunks: Iterable[str]) -> bool:
+    # The temp file only replaces the target once everything is written, so a crash never leaves a
+    # truncated file. Returns False when the file already had this content.
+    tmp_path, digest = stage_write(file_path, chunks)
+    try:
+        if os.path.exists(file_path) and digest == _existing_hash(file_path):
+            os.remove(tmp_path)
+            return False
+        commit_write(tmp_path, file_path)
+        return True
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
 def write_to_file(file_path: str, content: str) -> str:
     try:
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, "w") as f:
-            f.write(content)
+        if os.path.exists(file_path) and _existing_hash(file_path) == content_hash(content):
+            return f"No changes to {file_path}; skipped writing."
+        atomic_write(file_path, [content])
         return f"Successfully wrote to {file_path}"
     except Exception as e:
         return f"Error writing to file '{file_path}': {e}"
@@ -0,0 +1,60 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from tools.api_tool import api_tool
+
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+def make_session(pool_size: int = 16) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def shared_session() -> requests.Session:
+    # Keep-alive session shared by every tool in the process, so repeated calls to a host reuse connections.
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = make_session()
+        return _shared_session
+
+class HttpPool:
+    def __init__(self, max_workers: int = 8, per_host_limit: int = 4, timeout: float = 30.0, session: requests.Session = None):
+        self.timeout = timeout
+        self.per_host_limit = max(1, per_host_limit)
+        self.session = session or shared_session()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="http")
+        self._host_limits: Dict[str, threading.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    def fetch_all(self, requests_list: List[Dict[str, Any]]) -> List[str]:
+        # Requests run concurrently; results come back in the order they were given.
+        futures = [self._executor.submit(self._fetch, api_request) for api_request in requests_list]
+        return [future.result() for future in futures]
+
+    def _fetch(self, api_request: Dict[str, Any]) -> str:
+        url = api_request.get("url")
+        if not url:
+            return "Error: 'url' is required for each API call in the 'requests' list."
+
+        with self._host_limit(urlparse(url).netloc):
+            return api_tool(
+                url=url,
+                method=api_request.get("method", "GET"),
+                params=api_request.get("params"),
+                data=api_request.get("data"),
+                session=self.session,
+                timeout=api_request.get("timeout", self.timeout),
+            )
+
+    def _host_limit(self, host: str) -> threading.Semaphore:
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.Semaphore(self.per_host_limit)
+            return self._host_limits[host]
@@ -0,0 +1,153 @@
+import re
+
+# Conservative minifiers for the generated sites. They only drop what can never change behaviour:
+# comments and insignificant whitespace. Line breaks in JavaScript are kept so automatic semicolon
+# insertion works exactly as before, and strings, template literals and regex literals are copied verbatim.
+
+_RAW_HTML = re.compile(r"(<(pre|textarea|script|style)\b.*?</\2\s*>)", re.IGNORECASE | re.DOTALL)
+_HTML_COMMENT = re.compile(r"<!--(?!\[if).*?-->", re.DOTALL)
+_CSS_STRING = re.compile(r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')")
+# After one of these, a "/" starts a regex literal rather than a division.
+_REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_KEYWORDS = {"return", "typeof", "instanceof", "in", "of", "new", "delete", "void", "throw", "case", "do", "else", "yield", "await"}
+
+def minify_html(html: str) -> str:
+    # Trims every line and drops blank lines and comments; <pre>, <textarea>, <script> and <style> are left as they are.
+    parts = _RAW_HTML.split(html)
+    out = []
+    index = 0
+    while index < len(parts):
+        text = _HTML_COMMENT.sub("", parts[index])
+        out.append("\n".join(line.strip() for line in text.splitlines() if line.strip()))
+        if index + 1 < len(parts):
+            out.append(parts[index + 1])
+        index += 3
+    return "\n".join(part for part in out if part).strip() + "\n"
+
+def minify_css(css: str) -> str:
+    parts = _CSS_STRING.split(css)
+    out = []
+    for index, part in enumerate(parts):
+        if index % 2:
+            out.append(part)
+            continue
+        part = re.sub(r"/\*.*?\*/", "", part, flags=re.DOTALL)
+        part = re.sub(r"\s+", " ", part)
+        part = re.sub(r"\s*([{};,>])\s*", r"\1", part)
+        part = re.sub(r":\s+", ":", part)
+        part = part.replace(";}", "}")
+        out.append(part)
+    return "".join(out).strip() + "\n"
+
+def _skip_quoted(js: str, start: int) -> int:
+    # Returns the index just past the string or template literal that starts at `start`.
+    quote = js[start]
+    index = start + 1
+    depth = 0
+    while index < len(js):
+        char = js[index]
+        if char == "\\":
+            index += 2
+            continue
+        if quote == "`" and char == "$" and js.startswith("${", index):
+            depth += 1
+            index += 2
+            continue
+        if quote == "`" and depth and char == "}":
+            depth -= 1
+        elif char == quote and not depth:
+            return index + 1
+        elif quote != "`" and char == "\n":
+            return index
+        index += 1
+    return index
+
+def _skip_regex(js: str, start: int) -> int:
+    index = start + 1
+    in_class = False
+    while index < len(js) and js[index] != "\n":
+        char = js[index]
+        if char == "\\":
+            index += 2
+            continue
+        if char == "[":
+            in_class = True
+        elif char == "]":
+            in_class = False
+        elif char == "/" and not in_class:
+            index += 1
+            while index < len(js) and (js[index].isalnum() or js[index] in "_$"):
+                index += 1
+            return index
+        index += 1
+    return index
+
+def _regex_allowed(previous: str) -> bool:
+    # `previous` is the last piece of code before the "/", whitespace and comments excluded.
+    # A postfix ++ or -- ends an operand, so `a++ / 2` is a division.
+    if previous.endswith(("++", "--")):
+        return False
+    if not previous or previous[-1] in _REGEX_PRECEDERS:
+        return True
+    word = re.search(r"[A-Za-z_$][\w$]*$", previous)
+    return bool(word) and word.group(0) in _REGEX_KEYWORDS
+
+def _needs_space(before: str, after: str) -> bool:
+    # A space between two tokens matters only if dropping it would merge them: `return x`, `a - -b`, `1 .toString()`.
+    word = re.compile(r"[\w$\\]")
+    if word.match(before) and word.match(after):
+        return True
+    return (before == after and before in "+-") or (before.isdigit() and after == ".")
+
+def minify_js(js: str) -> str:
+    pieces = []  # (is_whitespace, text); literals and code are copied as they are.
+    previous = ""
+    index = 0
+    length = len(js)
+    while index < length:
+        char = js[index]
+        if char in "\"'`":
+            end = _skip_quoted(js, index)
+        elif js.startswith("//", index):
+            end = js.find("\n", index)
+            index = length if end == -1 else end
+            continue
+        elif js.startswith("/*", index):
+            end = js.find("*/", index + 2)
+            end = length if end == -1 else end + 2
+            # A block comment that spans lines still separates statements.
+            pieces.append((True, "\n" if "\n" in js[index:end] else " "))
+            index = end
+            continue
+        elif char == "/" and _regex_allowed(previous):
+            end = _skip_regex(js, index)
+        elif char in " \t\r\n":
+            end = index
+            while end < length and js[end] in " \t\r\n":
+                end += 1
+            pieces.append((True, "\n" if "\n" in js[index:end] else " "))
+            index = end
+            continue
+        else:
+            end = index + 1
+            while end < length and js[end] not in "\"'`/ \t\r\n":
+                end += 1
+        pieces.append((False, js[index:end]))
+        previous = js[index:end]
+        index = end
+
+    out = []
+    pending = ""
+    for is_whitespace, text in pieces:
+        if is_whitespace:
+            # Line breaks win over spaces so automatic semicolon insertion is unchanged.
+            pending = "\n" if "\n" in (pending, text) else " "
+            continue
+        if pending and out:
+            if pending == "\n":
+                out.append("\n")
+            elif _needs_space(out[-1][-1], text[0]):
+                out.append(" ")
+        pending = ""
+        out.append(text)
+    return "".join(out).strip() + "\n"
@@ -0,0 +1,48 @@
+import re
+from typing import List, Tuple
+
+SEARCH_REPLACE_BLOCK = re.compile(r"<<<<<<< SEARCH[^\n]*\n(.*?)^=======[^\n]*\n(.*?)^>>>>>>> REPLACE", re.DOTALL | re.MULTILINE)
+
+class PatchError(ValueError):
+    pass
+
+def parse_search_replace_blocks(text: str) -> List[Tuple[str, str]]:
+    return [(search, replace) for search, replace in SEARCH_REPLACE_BLOCK.findall(text or "")]
+
+def _find_lines(content: str, search: str) -> List[Tuple[int, int]]:
+    # Fallback match that ignores trailing whitespace on each line; returns (start, end) offsets.
+    content_lines = content.splitlines(keepends=True)
+    search_lines = [line.rstrip() for line in search.splitlines()]
+    if not search_lines:
+        return []
+    offsets = [0]
+    for line in content_lines:
+        offsets.append(offsets[-1] + len(line))
+    matches = []
+    for start in range(len(content_lines) - len(search_lines) + 1):
+        window = content_lines[start:start + len(search_lines)]
+        if [line.rstrip() for line in window] == search_lines:
+            matches.append((offsets[start], offsets[start + len(search_lines)]))
+    return matches
+
+def apply_search_replace(content: str, blocks: List[Tuple[str, str]]) -> str:
+    if not blocks:
+        raise PatchError("no SEARCH/REPLACE blocks found")
+
+    for index, (search, replace) in enumerate(blocks, start=1):
+        if not search.strip():
+            raise PatchError(f"block {index} has an empty SEARCH section")
+        count = content.count(search)
+        if count == 1:
+            content = content.replace(search, replace, 1)
+            continue
+        if count > 1:
+            raise PatchError(f"block {index} matches {count} places in the file")
+        matches = _find_lines(content, search)
+        if len(matches) != 1:
+            raise PatchError(f"block {index} {'does not match the file' if not matches else f'matches {len(matches)} places in the file'}")
+        start, end = matches[0]
+        if content[start:end].endswith("\n") and not replace.endswith("\n"):
+            replace += "\n"
+        content = content[:start] + replace + content[end:]
+    return content
@@ -0,0 +1,100 @@
+import json
+import re
+import xml.etree.ElementTree as ET
+from typing import Any, Callable, Dict, List, Tuple
+from urllib.parse import urlparse
+from llm.tokens import count_tokens
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+ARXIV = "{http://arxiv.org/schemas/atom}"
+
+Matcher = Callable[[str, str], bool]
+Normalizer = Callable[[str], List[Dict[str, Any]]]
+
+_normalizers: List[Tuple[Matcher, Normalizer]] = []
+
+def register_normalizer(matcher: Matcher, normalizer: Normalizer):
+    _normalizers.append((matcher, normalizer))
+
+def normalize_response(url: str, text: str) -> Any:
+    # Returns {"source", "records"} for responses a normalizer understands, the raw text otherwise.
+    for matcher, normalizer in _normalizers:
+        if not matcher(url or "", text):
+            continue
+        try:
+            return {"source": url, "records": normalizer(text)}
+        except (ET.ParseError, ValueError) as e:
+            print(f"[ResponseNormalizer] Could not normalize response from {url}: {e}")
+    return text
+
+def _clean(text: str) -> str:
+    return re.sub(r"\s+", " ", text or "").strip()
+
+def _is_arxiv_atom(url: str, text: str) -> bool:
+    return urlparse(url).netloc.endswith("arxiv.org") and "<feed" in text[:500]
+
+def normalize_arxiv_atom(text: str) -> List[Dict[str, Any]]:
+    root = ET.fromstring(text)
+    records = []
+    for entry in root.findall(f"{ATOM}entry"):
+        abs_url = _clean(entry.findtext(f"{ATOM}id"))
+        pdf_url = ""
+        for link in entry.findall(f"{ATOM}link"):
+            if link.get("title") == "pdf" or link.get("type") == "application/pdf":
+                pdf_url = link.get("href", "")
+        if not pdf_url and "/abs/" in abs_url:
+            pdf_url = abs_url.replace("/abs/", "/pdf/")
+        paper_id = pdf_url.rstrip("/").rsplit("/", 1)[-1]
+        if paper_id.endswith(".pdf"):
+            paper_id = paper_id[:-len(".pdf")]
+
+        primary = entry.find(f"{ARXIV}primary_category")
+        categories = [category.get("term") for category in entry.findall(f"{ATOM}category") if category.get("term")]
+        records.append({
+            "id": paper_id,
+            "title": _clean(entry.findtext(f"{ATOM}title")),
+            "authors": [_clean(author.findtext(f"{ATOM}name")) for author in entry.findall(f"{ATOM}author")],
+            "abstract": _clean(entry.findtext(f"{ATOM}summary")),
+            "category": primary.get("term") if primary is not None else (categories[0] if categories else ""),
+            "published": _clean(entry.findtext(f"{ATOM}published")),
+            "pdf_url": pdf_url,
+        })
+    return records
+
+register_normalizer(_is_arxiv_atom, normalize_arxiv_atom)
+
+def compact_json(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+def fit_to_budget(results: List[Any], max_tokens: int, abstract_limits: Tuple[int, ...] = (600, 300, 150)) -> List[Any]:
+    # Shrink normalized results until they fit: shorten abstracts first, then drop the last record of
+    # the largest source so every source keeps its share, and finally cut raw text.
+    if count_tokens(compact_json(results)) <= max_tokens:
+        return results
+
+    results = [dict(result, records=[dict(record) for record in result["records"]]) if isinstance(result, dict) and "records" in result else result for result in results]
+    record_groups = [result["records"] for result in results if isinstance(result, dict) and "records" in result]
+
+    for limit in abstract_limits:
+        for records in record_groups:
+            for record in records:
+                abstract = record.get("abstract", "")
+                if len(abstract) > limit:
+                    record["abstract"] = abstract[:limit].rstrip() + "..."
+        if count_tokens(compact_json(results)) <= max_tokens:
+            return results
+
+    while count_tokens(compact_json(results)) > max_tokens:
+        largest = max(record_groups, key=len, default=[])
+        if len(largest) <= 1:
+            break
+        largest.pop()
+
+    texts = [index for index, result in enumerate(results) if isinstance(result, str)]
+    overflow = count_tokens(compact_json(results)) - max_tokens
+    if overflow > 0 and texts:
+        # Raw responses share the remaining overflow evenly; ~4 characters per token.
+        cut = (overflow * 4) // len(texts) + 1
+        for index in texts:
+            results[index] = results[index][:max(0, len(results[index]) - cut)] + "...[truncated]"
+    return results
@@ -0,0 +1,119 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Tuple
+
+class SearchCache:
+    _shared: Dict[str, "SearchCache"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, db_path: Optional[str] = ".search_cache.sqlite3", ttl: float = 24 * 3600, max_entries: int = 512, max_db_entries: int = 10000):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # The database is bounded too: past max_db_entries, the entries read or written longest ago go first.
+        self.max_db_entries = max_db_entries
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS search_cache (key TEXT PRIMARY KEY, expires_at REAL, value TEXT, accessed_at REAL)")
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(search_cache)")}
+            if "accessed_at" not in columns:
+                # Databases written before the size cap; their entries count as least recently used.
+                self._db.execute("ALTER TABLE search_cache ADD COLUMN accessed_at REAL DEFAULT 0")
+            self._db.execute("CREATE INDEX IF NOT EXISTS search_cache_accessed_at ON search_cache (accessed_at)")
+            self._db.commit()
+
+    @classmethod
+    def shared(cls, db_path: Optional[str] = ".search_cache.sqlite3", ttl: float = 24 * 3600, max_db_entries: int = 10000) -> "SearchCache":
+        # One cache per database per process, so every BraveSearch instance shares hits and in-flight calls.
+        with cls._shared_lock:
+            if db_path not in cls._shared:
+                cls._shared[db_path] = cls(db_path, ttl, max_db_entries=max_db_entries)
+            return cls._shared[db_path]
+
+    @staticmethod
+    def make_key(query: str, num_results: int) -> str:
+        normalized = re.sub(r"\s+", " ", query).strip().strip("?!.,;:").lower()
+        return f"{num_results}:{normalized}"
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], str]) -> str:
+        cached = self._get(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            # Someone is already fetching this query; wait for their result instead of calling again.
+            return future.result()
+
+        try:
+            value = fetch()
+            self._put(key, value)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] > now:
+                self._memory.move_to_end(key)
+                return entry[1]
+            if self._db is None:
+                return None
+            row = self._db.execute("SELECT expires_at, value FROM search_cache WHERE key = ?", (key,)).fetchone()
+            if row and row[0] > now:
+                # Hits served from memory don't touch the row; the memory layer already keeps those entries.
+                self._db.execute("UPDATE search_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                self._db.commit()
+                self._remember(key, row[0], row[1])
+                return row[1]
+        return None
+
+    def _put(self, key: str, value: str):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._db is not None:
+                now = time.time()
+                self._db.execute("INSERT OR REPLACE INTO search_cache (key, expires_at, value, accessed_at) VALUES (?, ?, ?, ?)", (key, expires_at, value, now))
+                self._db.execute("DELETE FROM search_cache WHERE expires_at <= ?", (now,))
+                self._db.execute(
+                    "DELETE FROM search_cache WHERE key IN (SELECT key FROM search_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_db_entries,),
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, expires_at: float, value: str):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    @classmethod
+    def from_env(cls) -> Optional["SearchCache"]:
+        if os.getenv("BRAVE_CACHE", "on").lower() in ("0", "off", "false", "no"):
+            return None
+        return cls.shared(
+            db_path=os.getenv("BRAVE_CACHE_PATH", ".search_cache.sqlite3"),
+            ttl=float(os.getenv("BRAVE_CACHE_TTL", str(24 * 3600))),
+            max_db_entries=int(os.getenv("BRAVE_CACHE_MAX_ENTRIES", "10000")),
+        )
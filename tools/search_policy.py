@@ -0,0 +1,50 @@
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+from tools.search_cache import SearchCache
+
+FORMATTING_FEEDBACK = re.compile(r"\b(css|style|styling|format|formatting|indent|indentation|spacing|margin|padding|colou?r|font|layout|align|alignment|whitespace|typo|doctype|tag|tags|class name|responsive)\b", re.IGNORECASE)
+NEEDS_REFERENCE = re.compile(r"\b(api|library|framework|javascript|function|algorithm|fetch|async|error|exception|bibtex|clipboard)\b", re.IGNORECASE)
+
+class SearchPolicy:
+    # Decides whether a web search is worth a network round trip before an LLM call.
+    markup_extensions = (".css", ".html", ".htm")
+    data_extensions = (".js", ".json")
+
+    def should_search(self, kind: str, file_path: str, text: str, api_data: Any = None) -> bool:
+        if not text or not text.strip():
+            return False
+        extension = os.path.splitext(file_path or "")[1].lower()
+        if kind == "revision":
+            # Formatting-only fixes to markup and styles don't need outside references.
+            if extension in self.markup_extensions and FORMATTING_FEEDBACK.search(text) and not NEEDS_REFERENCE.search(text):
+                return False
+            return True
+        if api_data and extension in self.data_extensions and "data" in os.path.basename(file_path).lower():
+            # Data files are built from the API response; search results add nothing.
+            return False
+        return True
+
+class SearchPrefetcher:
+    def __init__(self, search_tool, max_workers: int = 4, num_results: int = 5):
+        self.search_tool = search_tool
+        self.num_results = num_results
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search-prefetch")
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def prefetch(self, query: str):
+        key = SearchCache.make_key(query, self.num_results)
+        with self._lock:
+            if key not in self._futures:
+                self._futures[key] = self._executor.submit(self.search_tool.search, query, self.num_results)
+
+    def get(self, query: str) -> str:
+        key = SearchCache.make_key(query, self.num_results)
+        with self._lock:
+            future: Optional[Future] = self._futures.pop(key, None)
+        if future is not None:
+            return future.result()
+        return self.search_tool.search(query, self.num_results)
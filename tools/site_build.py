@@ -0,0 +1,437 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+from typing import Any, Dict, List, Optional, Tuple
+from tools.file_tools import safe_name
+from tools.minify import minify_css, minify_html, minify_js
+from tools.response_normalizers import compact_json
+from tools.static_checks import check_js, is_data_file, load_data_records
+
+# Post-generation build for a generated site. The monolithic data file is split into one shard per
+# category and date, with an index of shards and category counts and a separate paper id -> shard map. Every page then fetches
+# only the slice it needs through a small loader. CSS and JavaScript are minified and fingerprinted.
+# A report compares what a page load costs before and after.
+
+_SCRIPT_TAG = re.compile(r"<script\b[^>]*?\bsrc\s*=\s*[\"']([^\"']+)[\"'][^>]*>\s*</script>", re.IGNORECASE)
+_ASSET_REF = re.compile(r"(\b(?:src|href)\s*=\s*[\"'])([^\"'#?]+)([\"'#?])", re.IGNORECASE)
+_DATA_VARIABLE = re.compile(r"(?:var|let|const)\s+([A-Za-z_$][\w$]*)\s*=\s*\[")
+
+# Runs in the browser in place of the data file and the page's own scripts. It reads the URL
+# parameters, fetches the matching shards into the data variable, and then loads the page's scripts in order.
+LOADER_JS = r"""
+(function () {
+    var config = __CONFIG__;
+    var loader = document.currentScript;
+    var base = loader.src.slice(0, loader.src.lastIndexOf("/") + 1);
+    var apps = (loader.getAttribute("data-app") || "").split(" ").filter(Boolean);
+
+    function getJSON(path) {
+        return fetch(base + path).then(function (response) {
+            if (!response.ok) throw new Error(path + ": HTTP " + response.status);
+            return response.json();
+        });
+    }
+
+    function categoryShards(index, values, exact) {
+        var names = Object.keys(index.categories);
+        for (var i = 0; i < values.length; i++) {
+            var matches = names.filter(function (name) { return exact ? name === values[i] : name.indexOf(values[i]) !== -1; });
+            if (matches.length) return index.shards.filter(function (shard) { return matches.indexOf(shard.category) !== -1; });
+        }
+        return null;
+    }
+
+    // A parameter naming a category loads that category and one naming a paper id loads that paper's shard;
+    // the id map is only fetched when no category matched. Without either, the newest day is loaded.
+    function pickShards(index) {
+        var values = [];
+        new URLSearchParams(window.location.search).forEach(function (value) { values.push(value); });
+        var latest = index.shards.length ? index.shards[0].date : null;
+        var fallback = function () {
+            return categoryShards(index, values, false) || index.shards.filter(function (shard) { return shard.date === latest; });
+        };
+        var shards = categoryShards(index, values, true);
+        if (shards || !values.length) return Promise.resolve(shards || fallback());
+        return getJSON(index.ids).then(function (ids) {
+            for (var i = 0; i < values.length; i++) {
+                if (Object.prototype.hasOwnProperty.call(ids, values[i])) return [index.shards[ids[values[i]]]];
+            }
+            return fallback();
+        });
+    }
+
+    // The deferred scripts usually wait for DOMContentLoaded or load, which fired while the data was loading.
+    // Their handlers for an event that has already fired are kept and called once they have all run; the
+    // events are not dispatched again, so no other script on the page sees them twice.
+    var missed = [];
+    var restore = [];
+    function capture(target, type, fired) {
+        var add = target.addEventListener;
+        target.addEventListener = function (eventType, handler, options) {
+            if (eventType === type && fired() && handler) missed.push({target: target, type: type, handler: handler});
+            else add.call(target, eventType, handler, options);
+        };
+        restore.push(function () { target.addEventListener = add; });
+    }
+    capture(document, "DOMContentLoaded", function () { return document.readyState !== "loading"; });
+    capture(window, "load", function () { return document.readyState === "complete"; });
+    var onload = window.onload;
+
+    function runApps(position) {
+        if (position >= apps.length) {
+            restore.forEach(function (undo) { undo(); });
+            if (window.onload !== onload && typeof window.onload === "function" && document.readyState === "complete") {
+                missed.push({target: window, type: "load", handler: window.onload});
+            }
+            missed.forEach(function (entry) {
+                var event = new Event(entry.type);
+                if (typeof entry.handler === "function") entry.handler.call(entry.target, event);
+                else entry.handler.handleEvent(event);
+            });
+            return;
+        }
+        var script = document.createElement("script");
+        script.src = apps[position];
+        script.onload = script.onerror = function () { runApps(position + 1); };
+        document.body.appendChild(script);
+    }
+
+    getJSON(config.index).then(function (index) {
+        window.SiteData = {index: index};
+        return pickShards(index);
+    }).then(function (shards) {
+        return Promise.all(shards.map(function (shard) { return getJSON(shard.file); }));
+    }).then(function (slices) {
+        window[config.variable] = [].concat.apply([], slices);
+    }).catch(function (error) {
+        console.error("Could not load the paper data:", error);
+        window[config.variable] = [];
+    }).then(function () { runApps(0); });
+})();
+"""
+
+def fingerprint(path: str, content: str) -> str:
+    # "css/style.css" -> "css/style.3f9a0c1d2e.css"; a new name whenever the content changes, so it can be cached forever.
+    base, extension = os.path.splitext(path)
+    return f"{base}.{hashlib.sha256(content.encode('utf-8')).hexdigest()[:10]}{extension}"
+
+def shard_key(record: Dict[str, Any]) -> Tuple[str, str]:
+    category = record.get("category") or "uncategorized"
+    if isinstance(category, list):
+        category = category[0] if category else "uncategorized"
+    date = str(record.get("published") or record.get("date") or record.get("updated") or "")[:10]
+    return str(category), date or "undated"
+
+def shard_records(records: List[Dict[str, Any]]) -> List[Tuple[str, str, List[Dict[str, Any]]]]:
+    # Newest day first (undated last), then by category; records keep their order inside a shard.
+    groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for record in records:
+        groups.setdefault(shard_key(record), []).append(record)
+    keys = sorted(groups)
+    # Both sorts are stable, so categories stay in order within a day.
+    keys.sort(key=lambda key: key[1], reverse=True)
+    keys.sort(key=lambda key: key[1] == "undated")
+    return [(category, date, groups[(category, date)]) for category, date in keys]
+
+def _gzip_size(content: str) -> int:
+    return len(gzip.compress(content.encode("utf-8"), mtime=0))
+
+def _load_records(path: str, content: str) -> Optional[List[Dict[str, Any]]]:
+    if path.endswith(".json"):
+        try:
+            data = json.loads(content)
+        except ValueError:
+            return None
+    else:
+        data = load_data_records(content)
+    if not isinstance(data, list) or not all(isinstance(record, dict) for record in data):
+        return None
+    return data
+
+# Marks a directory as build output, so a later build may delete it.
+BUILD_MARKER = ".site-build"
+
+class SiteBuild:
+    def __init__(self, site_dir: str, out_dir: Optional[str] = None, rtt_ms: float = 150, bandwidth_kbps: float = 1600):
+        self.site_dir = site_dir
+        self.out_dir = out_dir or os.path.join(site_dir, "dist")
+        self.rtt_ms = rtt_ms
+        self.bandwidth_kbps = bandwidth_kbps
+        self.sources: Dict[str, str] = {}
+        # Files that are not text (images, fonts) are copied unchanged.
+        self.binaries: List[str] = []
+        self.outputs: Dict[str, str] = {}
+        # Source path -> fingerprinted output path, both relative to the site root.
+        self.manifest: Dict[str, str] = {}
+        self.data_path: Optional[str] = None
+        self.index: Dict[str, Any] = {}
+        self.index_path: Optional[str] = None
+        self.ids_path: Optional[str] = None
+        self.loader_path: Optional[str] = None
+
+    def run(self) -> Dict[str, Any]:
+        self._read_sources()
+        self._build_data()
+        self._build_assets()
+        self._build_pages()
+        self._prepare_out_dir()
+        for path, content in self.outputs.items():
+            target = os.path.join(self.out_dir, path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "w", encoding="utf-8") as f:
+                f.write(content)
+        for path in self.binaries:
+            target = os.path.join(self.out_dir, path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(os.path.join(self.site_dir, path), target)
+        report = self.report()
+        with open(os.path.join(self.out_dir, "build-report.json"), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return report
+
+    def _prepare_out_dir(self):
+        # Only a directory an earlier build wrote (it has BUILD_MARKER) is cleared. Anything else already
+        # there is left alone and the build goes to a fresh directory next to it.
+        out_dir = os.path.realpath(self.out_dir)
+        for protected in (os.path.realpath(self.site_dir), os.path.realpath(os.getcwd())):
+            if protected == out_dir or protected.startswith(out_dir.rstrip(os.sep) + os.sep):
+                raise ValueError(f"refusing to build into {self.out_dir}: it contains {protected}")
+        if os.path.isfile(os.path.join(self.out_dir, BUILD_MARKER)):
+            shutil.rmtree(self.out_dir)
+        elif os.path.exists(self.out_dir) and (not os.path.isdir(self.out_dir) or os.listdir(self.out_dir)):
+            base, suffix = self.out_dir.rstrip("/" + os.sep), 1
+            while os.path.exists(f"{base}-{suffix}"):
+                suffix += 1
+            print(f"[SiteBuild] {self.out_dir} was not written by a site build; writing to {base}-{suffix} instead.")
+            self.out_dir = f"{base}-{suffix}"
+        os.makedirs(self.out_dir, exist_ok=True)
+        with open(os.path.join(self.out_dir, BUILD_MARKER), "w", encoding="utf-8") as f:
+            f.write("Written by tools/site_build.py; the next build clears this directory.\n")
+
+    def _read_sources(self):
+        out_dir = os.path.abspath(self.out_dir)
+        for root, dirs, names in os.walk(self.site_dir):
+            # Earlier builds (the output dir, or any directory with BUILD_MARKER) are not part of the site.
+            dirs[:] = [name for name in dirs if not name.startswith(".") and os.path.abspath(os.path.join(root, name)) != out_dir
+                       and not os.path.isfile(os.path.join(root, name, BUILD_MARKER))]
+            for name in names:
+                if name.startswith("."):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        self.sources[os.path.relpath(path, self.site_dir).replace(os.sep, "/")] = f.read()
+                except UnicodeDecodeError:
+                    self.binaries.append(os.path.relpath(path, self.site_dir))
+                except OSError as e:
+                    print(f"[SiteBuild] Skipping {path}: {e}")
+
+    def _build_data(self):
+        records = None
+        for path in sorted(self.sources):
+            if not is_data_file(path):
+                continue
+            records = _load_records(path, self.sources[path])
+            if records is not None:
+                self.data_path = path
+                break
+            print(f"[SiteBuild] {path} does not hold a list of records; it is not sharded.")
+        if self.data_path is None:
+            return
+
+        match = _DATA_VARIABLE.search(self.sources[self.data_path])
+        shards, ids = [], {}
+        for position, (category, date, shard) in enumerate(shard_records(records)):
+            content = compact_json(shard)
+            file_path = fingerprint(f"data/{safe_name(category)}/{safe_name(date)}.json", content)
+            self.outputs[file_path] = content
+            shards.append({"category": category, "date": date, "count": len(shard), "file": file_path})
+            for record in shard:
+                if record.get("id") is not None:
+                    ids.setdefault(str(record["id"]), position)
+
+        categories: Dict[str, int] = {}
+        dates: Dict[str, int] = {}
+        for shard in shards:
+            categories[shard["category"]] = categories.get(shard["category"], 0) + shard["count"]
+            dates[shard["date"]] = dates.get(shard["date"], 0) + shard["count"]
+        content = compact_json(ids)
+        self.ids_path = fingerprint("data/ids.json", content)
+        self.outputs[self.ids_path] = content
+        self.index = {
+            "total": len(records),
+            "categories": dict(sorted(categories.items())),
+            "dates": dict(sorted(dates.items(), reverse=True)),
+            "shards": shards,
+            "ids": self.ids_path,
+        }
+        content = compact_json(self.index)
+        self.index_path = fingerprint("data/index.json", content)
+        self.outputs[self.index_path] = content
+
+        config = {"index": self.index_path, "variable": match.group(1) if match else "papers"}
+        loader = minify_js(LOADER_JS.replace("__CONFIG__", compact_json(config)))
+        self.loader_path = fingerprint("loader.js", loader)
+        self.outputs[self.loader_path] = loader
+        print(f"[SiteBuild] Split {len(records)} records from {self.data_path} into {len(shards)} shards.")
+
+    def _build_assets(self):
+        for path, content in sorted(self.sources.items()):
+            extension = os.path.splitext(path)[1].lower()
+            if path == self.data_path or extension in (".html", ".htm"):
+                continue
+            if extension == ".css":
+                content = minify_css(content)
+            elif extension in (".js", ".mjs"):
+                minified = minify_js(content)
+                # The minifier is conservative, but a file it breaks is shipped unminified rather than broken.
+                if check_js(minified) and not check_js(content):
+                    print(f"[SiteBuild] Minifying {path} broke it; keeping the original.")
+                else:
+                    content = minified
+            else:
+                self.outputs[path] = content
+                continue
+            self.manifest[path] = fingerprint(path, content)
+            self.outputs[self.manifest[path]] = content
+
+    def _build_pages(self):
+        for path, html in sorted(self.sources.items()):
+            if os.path.splitext(path)[1].lower() not in (".html", ".htm"):
+                continue
+            page_dir = os.path.dirname(path)
+            if self.loader_path:
+                html = self._use_loader(html, page_dir)
+
+            def rewrite(match):
+                target = self._resolve(page_dir, match.group(2))
+                if target not in self.manifest:
+                    return match.group(0)
+                return match.group(1) + self._relative(page_dir, self.manifest[target]) + match.group(3)
+
+            self.outputs[path] = minify_html(_ASSET_REF.sub(rewrite, html))
+
+    def _use_loader(self, html: str, page_dir: str) -> str:
+        # The data script and every local script after it are replaced by one loader tag that runs them once the data is in.
+        tags = list(_SCRIPT_TAG.finditer(html))
+        data_at = next((index for index, tag in enumerate(tags) if self._resolve(page_dir, tag.group(1)) == self.data_path), None)
+        if data_at is None:
+            return html
+        apps = [tag for tag in tags[data_at + 1:] if self._resolve(page_dir, tag.group(1)) in self.manifest]
+        sources = " ".join(self._relative(page_dir, self.manifest[self._resolve(page_dir, tag.group(1))]) for tag in apps)
+        loader_tag = f'<script src="{self._relative(page_dir, self.loader_path)}" data-app="{sources}"></script>'
+        for tag in sorted(apps + [tags[data_at]], key=lambda tag: tag.start(), reverse=True):
+            replacement = loader_tag if tag is tags[data_at] else ""
+            html = html[:tag.start()] + replacement + html[tag.end():]
+        # Preloading the index and the page's scripts saves two round trips before the page renders.
+        preloads = [f'<link rel="preload" href="{self._relative(page_dir, self.index_path)}" as="fetch" crossorigin>']
+        preloads += [f'<link rel="preload" href="{source}" as="script">' for source in sources.split()]
+        head_end = html.lower().find("</head>")
+        if head_end != -1:
+            html = html[:head_end] + "\n".join(preloads) + "\n" + html[head_end:]
+        return html
+
+    def _resolve(self, page_dir: str, reference: str) -> Optional[str]:
+        if re.match(r"^[a-z][a-z0-9+.-]*:|^/", reference, re.IGNORECASE):
+            return None
+        return os.path.normpath(os.path.join(page_dir, reference)).replace(os.sep, "/")
+
+    def _relative(self, page_dir: str, path: str) -> str:
+        return os.path.relpath(path, page_dir or ".").replace(os.sep, "/")
+
+    def report(self) -> Dict[str, Any]:
+        files = []
+        for path, content in sorted(self.sources.items()):
+            output = self.outputs.get(self.manifest.get(path, path))
+            if output is None:
+                continue
+            files.append(self._file_row(path, [content], [output]))
+        if self.loader_path:
+            built = [self.outputs[shard["file"]] for shard in self.index["shards"]] + [self.outputs[self.index_path], self.outputs[self.ids_path]]
+            files.append(self._file_row(f"{self.data_path} ({len(built) - 2} shards + index)", [self.sources[self.data_path]], built))
+        report: Dict[str, Any] = {"site": self.site_dir, "out_dir": self.out_dir, "files": files, "page_loads": []}
+        if not self.loader_path:
+            return report
+
+        # Page loads are modelled on the heaviest page that loads the data; all pages share the same assets.
+        pages = [path for path in self.sources if os.path.splitext(path)[1].lower() in (".html", ".htm")]
+        shells = []
+        for page in pages:
+            page_dir = os.path.dirname(page)
+            references = {self._resolve(page_dir, match.group(2)) for match in _ASSET_REF.finditer(self.sources[page])}
+            if self.data_path in references:
+                assets = sorted(reference for reference in references if reference in self.manifest)
+                shells.append((page, assets))
+        if not shells:
+            return report
+        page, assets = max(shells, key=lambda shell: sum(len(self.sources[path]) for path in [shell[0]] + shell[1]))
+
+        monolithic = [self.sources[path] for path in [page, self.data_path] + assets]
+        report["page_loads"].append(self._page_load("monolithic", monolithic, rounds=2))
+
+        shell = [self.outputs[page]] + [self.outputs[self.manifest[path]] for path in assets] + [self.outputs[self.loader_path], self.outputs[self.index_path]]
+        shards = self.index["shards"]
+        latest = [shard for shard in shards if shard["date"] == shards[0]["date"]]
+        largest_category = max(self.index["categories"], key=self.index["categories"].get)
+        # HTML, then CSS, the loader and the preloaded index and scripts, then (for a paper) the id map, then the shards.
+        scenarios = [
+            (f"sharded, no parameter (latest day {shards[0]['date']})", latest, [], 3),
+            (f"sharded, category {largest_category} (largest)", [shard for shard in shards if shard["category"] == largest_category], [], 3),
+            ("sharded, one paper (largest shard)", [max(shards, key=lambda shard: shard["count"])], [self.outputs[self.ids_path]], 4),
+        ]
+        for name, selected, extra, rounds in scenarios:
+            report["page_loads"].append(self._page_load(name, shell + extra + [self.outputs[shard["file"]] for shard in selected], rounds))
+        return report
+
+    def _file_row(self, name: str, sources: List[str], outputs: List[str]) -> Dict[str, Any]:
+        return {
+            "file": name,
+            "bytes": sum(len(content.encode("utf-8")) for content in sources),
+            "built_bytes": sum(len(content.encode("utf-8")) for content in outputs),
+            "gzip": sum(_gzip_size(content) for content in sources),
+            "built_gzip": sum(_gzip_size(content) for content in outputs),
+        }
+
+    def _page_load(self, name: str, contents: List[str], rounds: int) -> Dict[str, Any]:
+        size = sum(len(content.encode("utf-8")) for content in contents)
+        compressed = sum(_gzip_size(content) for content in contents)
+        # Rough estimate: one round trip per dependent round of requests plus the transfer time of the gzipped bytes.
+        estimate = rounds * self.rtt_ms + compressed * 8 / self.bandwidth_kbps
+        return {"scenario": name, "requests": len(contents), "bytes": size, "gzip": compressed, "est_ms": round(estimate)}
+
+def format_report(report: Dict[str, Any]) -> str:
+    header = f"{'file':<36} {'bytes':>9} {'built':>9} {'gzip':>8} {'built gz':>9}"
+    lines = [header, "-" * len(header)]
+    for row in report["files"]:
+        lines.append(f"{row['file'][:36]:<36} {row['bytes']:>9} {row['built_bytes']:>9} {row['gzip']:>8} {row['built_gzip']:>9}")
+    if report["page_loads"]:
+        header = f"{'page load':<48} {'requests':>8} {'bytes':>9} {'gzip':>8} {'est ms':>7}"
+        lines += ["", header, "-" * len(header)]
+        for row in report["page_loads"]:
+            lines.append(f"{row['scenario'][:48]:<48} {row['requests']:>8} {row['bytes']:>9} {row['gzip']:>8} {row['est_ms']:>7}")
+    return "\n".join(lines)
+
+def build_site(site_dir: str, out_dir: Optional[str] = None, rtt_ms: float = 150, bandwidth_kbps: float = 1600) -> Dict[str, Any]:
+    report = SiteBuild(site_dir, out_dir, rtt_ms, bandwidth_kbps).run()
+    print(format_report(report))
+    print(f"[SiteBuild] Wrote {report['out_dir']} (report: build-report.json).")
+    return report
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Shard, minify and fingerprint a generated site.")
+    parser.add_argument("site_dir", help="Directory of the generated site, e.g. output/arxiv_cs_daily.")
+    parser.add_argument("--out", help="Where the built site is written. Defaults to <site_dir>/dist.")
+    parser.add_argument("--rtt-ms", type=float, default=150, help="Round-trip time used for the load time estimate.")
+    parser.add_argument("--bandwidth-kbps", type=float, default=1600, help="Bandwidth used for the load time estimate.")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        build_site(args.site_dir, args.out, args.rtt_ms, args.bandwidth_kbps)
+    except ValueError as e:
+        raise SystemExit(f"[SiteBuild] {e}")
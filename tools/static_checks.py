@@ -0,0 +1,280 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from html.parser import HTMLParser
+from typing import Any, List, Optional
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+# Tags whose end tag may be omitted in valid HTML; unclosed ones are not reported.
+OPTIONAL_END_TAGS = {"p", "li", "dt", "dd", "option", "optgroup", "tr", "td", "th", "thead", "tbody", "tfoot", "colgroup", "caption", "rt", "rp", "html", "head", "body"}
+# Required in paper listings only; other data files (todo items, products, ...) have their own shape.
+DATA_REQUIRED_FIELDS = ("id", "title", "authors", "category")
+PAPER_FIELDS = ("authors", "abstract", "summary", "pdf_url")
+
+NODE = shutil.which("node")
+
+# A "/" after one of these characters or keywords starts a regex literal; after an operand it is a division.
+_REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_KEYWORDS = {"return", "typeof", "instanceof", "in", "of", "new", "delete", "void", "throw", "case", "do", "else", "yield", "await"}
+
+_DATA_LOADER_JS = r"""
+const vm = require('vm');
+const fs = require('fs');
+let code = fs.readFileSync(0, 'utf8');
+code = code.replace(/^(\s*)export\s+default\s+/gm, '$1var __default__ = ').replace(/^(\s*)export\s+/gm, '$1').replace(/^(\s*)(const|let)\s/gm, '$1var ');
+const ctx = vm.createContext(Object.create(null), {codeGeneration: {strings: false, wasm: false}});
+vm.runInContext('var module = {exports: {}}; var exports = module.exports; var window = this;', ctx);
+vm.runInContext(code, ctx, {timeout: 2000});
+const found = vm.runInContext(`
+  [module.exports].concat(Object.values(this))
+    .filter(value => Array.isArray(value) && value.length && typeof value[0] === 'object')
+    .map(value => JSON.stringify(value))[0] || 'null'`, ctx, {timeout: 2000});
+process.stdout.write(String(found));
+"""
+
+class _HTMLStructureChecker(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []
+        self.seen = set()
+        self.has_doctype = False
+        self.problems: List[str] = []
+        self.inline_scripts: List[str] = []
+        self._in_inline_script = False
+
+    def handle_decl(self, decl):
+        if decl.lower().startswith("doctype"):
+            self.has_doctype = True
+
+    def handle_starttag(self, tag, attrs):
+        self.seen.add(tag)
+        if tag in VOID_TAGS:
+            return
+        self.stack.append((tag, self.getpos()[0]))
+        attributes = dict(attrs)
+        script_type = (attributes.get("type") or "").lower()
+        self._in_inline_script = tag == "script" and not attributes.get("src") and script_type in ("", "module", "text/javascript", "application/javascript")
+
+    def handle_startendtag(self, tag, attrs):
+        self.seen.add(tag)
+
+    def handle_data(self, data):
+        if self._in_inline_script and data.strip():
+            self.inline_scripts.append(data)
+
+    def handle_endtag(self, tag):
+        self._in_inline_script = False
+        if tag in VOID_TAGS:
+            return
+        line = self.getpos()[0]
+        if not any(open_tag == tag for open_tag, _ in self.stack):
+            self.problems.append(f"line {line}: closing </{tag}> has no matching opening tag")
+            return
+        while self.stack:
+            open_tag, open_line = self.stack.pop()
+            if open_tag == tag:
+                return
+            if open_tag not in OPTIONAL_END_TAGS:
+                self.problems.append(f"line {open_line}: <{open_tag}> is not closed before </{tag}> on line {line}")
+
+def check_html(code: str) -> List[str]:
+    checker = _HTMLStructureChecker()
+    checker.feed(code)
+    checker.close()
+    problems = list(checker.problems)
+    for open_tag, open_line in checker.stack:
+        if open_tag not in OPTIONAL_END_TAGS:
+            problems.append(f"line {open_line}: <{open_tag}> is never closed")
+    if not checker.has_doctype:
+        problems.append("missing <!DOCTYPE html> declaration")
+    for tag in ("html", "head", "body"):
+        if tag not in checker.seen:
+            problems.append(f"missing <{tag}> element")
+    for script in checker.inline_scripts:
+        problems.extend(f"inline script: {problem}" for problem in check_js(script))
+    return problems
+
+def _strip_css(code: str) -> str:
+    code = re.sub(r"/\*.*?\*/", "", code, flags=re.DOTALL)
+    return re.sub(r"\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*'", "\"\"", code)
+
+def check_css(code: str) -> List[str]:
+    problems = []
+    if code.count("/*") > len(re.findall(r"/\*.*?\*/", code, flags=re.DOTALL)):
+        problems.append("unterminated /* comment")
+    stripped = _strip_css(code)
+    if re.search(r"<\s*/?\s*(style|html|head|body|script|!doctype)\b", stripped, re.IGNORECASE):
+        problems.append("file contains HTML markup; a .css file may only contain CSS")
+    depth = 0
+    for line_number, line in enumerate(stripped.splitlines(), start=1):
+        for char in line:
+            if char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+                if depth < 0:
+                    problems.append(f"line {line_number}: unexpected '}}'")
+                    depth = 0
+    if depth > 0:
+        problems.append(f"{depth} unclosed '{{' block(s)")
+    return problems
+
+def _check_js_with_node(code: str) -> List[str]:
+    suffix = ".mjs" if re.search(r"^\s*(import|export)\s", code, re.MULTILINE) else ".js"
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(code)
+        result = subprocess.run([NODE, "--check", path], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return []
+    finally:
+        os.remove(path)
+    if result.returncode == 0:
+        return []
+    lines = [line for line in result.stderr.replace(path, "<file>").splitlines() if line.strip() and not line.startswith("Node.js v") and not line.lstrip().startswith("at ")]
+    return ["syntax error: " + " | ".join(lines[:4])]
+
+def _regex_can_start(previous: str) -> bool:
+    # `previous` is the last token before the "/". A postfix ++ or -- ends an operand, as in `a++ / 2`.
+    if previous in ("++", "--"):
+        return False
+    return not previous or previous[-1] in _REGEX_PRECEDERS or previous in _REGEX_KEYWORDS
+
+def _check_js_brackets(code: str) -> List[str]:
+    # Fallback when node is not installed: bracket balance outside strings, comments and regexes.
+    pairs = {")": "(", "]": "[", "}": "{"}
+    stack = []
+    i, line, n = 0, 1, len(code)
+    previous = ""  # the last token before i, whitespace and comments excluded
+    while i < n:
+        char = code[i]
+        if char == "\n":
+            line += 1
+        if code.startswith("//", i):
+            end = code.find("\n", i)
+            i = n if end == -1 else end
+            continue
+        if code.startswith("/*", i):
+            end = code.find("*/", i + 2)
+            if end == -1:
+                return [f"line {line}: unterminated /* comment"]
+            line += code.count("\n", i, end)
+            i = end + 2
+            continue
+        if char in "\"'`" or (char == "/" and _regex_can_start(previous)):
+            quote, start_line = char, line
+            i += 1
+            while i < n and code[i] != quote:
+                if code[i] == "\\":
+                    i += 1
+                elif code[i] == "\n":
+                    if quote != "`":
+                        return [f"line {start_line}: unterminated string or regular expression"]
+                    line += 1
+                i += 1
+            if i >= n:
+                return [f"line {start_line}: unterminated string or template literal"]
+            previous = quote if quote != "/" else ")"
+            i += 1
+            continue
+        if char in "([{":
+            stack.append((char, line))
+        elif char in ")]}":
+            if not stack or stack[-1][0] != pairs[char]:
+                return [f"line {line}: unexpected '{char}'"]
+            stack.pop()
+        if not char.isspace():
+            if re.match(r"[\w$]", char) and i and re.match(r"[\w$]", code[i - 1]):
+                previous += char
+            elif char in "+-" and previous == char and code[i - 1] == char:
+                previous += char
+            else:
+                previous = char
+        i += 1
+    return [f"line {open_line}: '{char}' is never closed" for char, open_line in stack]
+
+def check_js(code: str) -> List[str]:
+    return _check_js_with_node(code) if NODE else _check_js_brackets(code)
+
+def load_data_records(code: str) -> Optional[List[Any]]:
+    # The file is generated code, so node runs it in a vm context whose globals are all created inside it:
+    # no require, process or host objects, no eval or new Function, and a 2s timeout. node's vm is still
+    # not a security boundary; only run this on output you would open in a browser anyway.
+    if NODE:
+        try:
+            result = subprocess.run([NODE, "-e", _DATA_LOADER_JS], input=code, capture_output=True, text=True, timeout=10)
+            if result.returncode == 0:
+                return json.loads(result.stdout or "null")
+        except (OSError, subprocess.TimeoutExpired, ValueError):
+            pass
+        return None
+    start, end = code.find("["), code.rfind("]")
+    if start == -1 or end <= start:
+        return None
+    literal = re.sub(r"([{,]\s*)([A-Za-z_$][\w$]*)\s*:", r'\1"\2":', code[start:end + 1])
+    literal = re.sub(r",\s*([}\]])", r"\1", literal)
+    try:
+        return json.loads(literal)
+    except ValueError:
+        return None
+
+def check_data_records(records: Optional[List[Any]]) -> List[str]:
+    if records is None:
+        return []
+    if not records:
+        return ["data file defines no records"]
+    problems = []
+    papers = any(isinstance(record, dict) and any(field in record for field in PAPER_FIELDS) for record in records)
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            problems.append(f"record {index} is not an object")
+            continue
+        label = f"record {index} ({record.get('id', 'no id')})"
+        if not papers:
+            continue
+        missing = [field for field in DATA_REQUIRED_FIELDS if not record.get(field)]
+        if not (record.get("abstract") or record.get("summary")):
+            missing.append("abstract")
+        if missing:
+            problems.append(f"{label} is missing {', '.join(missing)}")
+        pdf_url = record.get("pdf_url")
+        if pdf_url and record.get("id"):
+            suffix = str(pdf_url).rstrip("/").rsplit("/", 1)[-1]
+            if suffix.endswith(".pdf"):
+                suffix = suffix[:-len(".pdf")]
+            if str(record["id"]) != suffix:
+                problems.append(f"{label}: id should be the pdf_url suffix '{suffix}'")
+    ids = [record.get("id") for record in records if isinstance(record, dict) and record.get("id")]
+    duplicates = sorted({paper_id for paper_id in ids if ids.count(paper_id) > 1})
+    if duplicates:
+        problems.append(f"duplicate ids: {', '.join(map(str, duplicates))}")
+    return problems
+
+def is_data_file(file_path: str) -> bool:
+    name = os.path.basename(file_path).lower()
+    return name.startswith("data") and name.endswith((".js", ".json"))
+
+def run_static_checks(file_path: str, code: str) -> List[str]:
+    if not code.strip():
+        return ["file is empty"]
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in (".html", ".htm"):
+        return check_html(code)
+    if extension == ".css":
+        return check_css(code)
+    if extension == ".json":
+        try:
+            data = json.loads(code)
+        except ValueError as e:
+            return [f"invalid JSON: {e}"]
+        return check_data_records(data if isinstance(data, list) else None) if is_data_file(file_path) else []
+    if extension in (".js", ".mjs"):
+        problems = check_js(code)
+        if not problems and is_data_file(file_path):
+            problems = check_data_records(load_data_records(code))
+        return problems
+    return []
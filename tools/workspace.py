@@ -0,0 +1,130 @@
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+from tools.file_tools import commit_write, content_hash, read_file, same_file_content, stage_write, sweep_temp_files, write_to_file
+
+class Workspace:
+    # In-memory overlay over the files of one run. Agents read and write through it; dirty files
+    # reach disk (atomically, and only if their content changed) when flush() is called.
+    def __init__(self):
+        self._files: Dict[str, str] = {}
+        self._hashes: Dict[str, str] = {}
+        self._dirty: Set[str] = set()
+        # Streamed files are not held in memory: they wait in a temp file next to the target until flush().
+        self._staged: Dict[str, str] = {}
+        # Directories already cleared of temp files an earlier, crashed run left behind.
+        self._swept: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def read(self, file_path: str) -> str:
+        key = os.path.normpath(file_path)
+        with self._lock:
+            if key in self._files:
+                return self._files[key]
+            staged = self._staged.get(key)
+        if staged:
+            return read_file(staged)
+        content = read_file(file_path)
+        if content.startswith("Error"):
+            return content
+        with self._lock:
+            # A write may have landed while the file was being read; it wins.
+            self._files.setdefault(key, content)
+            self._hashes.setdefault(key, content_hash(content))
+            return self._files[key]
+
+    def exists(self, file_path: str) -> bool:
+        with self._lock:
+            if os.path.normpath(file_path) in self._files or os.path.normpath(file_path) in self._staged:
+                return True
+        return os.path.exists(file_path)
+
+    def hash(self, file_path: str) -> Optional[str]:
+        with self._lock:
+            if os.path.normpath(file_path) in self._hashes:
+                return self._hashes[os.path.normpath(file_path)]
+        if not self.exists(file_path):
+            return None
+        self.read(file_path)
+        with self._lock:
+            return self._hashes.get(os.path.normpath(file_path))
+
+    def write(self, file_path: str, content: str) -> str:
+        key = os.path.normpath(file_path)
+        new_hash = content_hash(content)
+        if self.exists(file_path):
+            self.read(file_path)
+        with self._lock:
+            if self._hashes.get(key) == new_hash:
+                return f"No changes to {file_path}; skipped writing."
+            self._files[key] = content
+            self._hashes[key] = new_hash
+            self._dirty.add(key)
+            staged = self._staged.pop(key, None)
+        if staged:
+            os.remove(staged)
+        return f"Successfully wrote to {file_path}"
+
+    def write_stream(self, file_path: str, chunks: Iterable[str]) -> str:
+        # The file only changes once the whole stream has arrived, so readers never see half a file.
+        key = os.path.normpath(file_path)
+        self._sweep(os.path.dirname(key))
+        try:
+            tmp_path, new_hash = stage_write(key, chunks)
+        except Exception as e:
+            return f"Error writing to file '{file_path}': {e}"
+        with self._lock:
+            known = key in self._hashes
+        # A file this run has not touched is compared on disk block by block instead of being read and hashed.
+        unchanged_on_disk = not known and os.path.isfile(key) and same_file_content(tmp_path, key)
+        with self._lock:
+            if self._hashes.get(key) == new_hash or (unchanged_on_disk and key not in self._hashes):
+                if unchanged_on_disk:
+                    self._hashes[key] = new_hash
+                stale = tmp_path
+                result = f"No changes to {file_path}; skipped writing."
+            else:
+                stale = self._staged.get(key)
+                self._staged[key] = tmp_path
+                self._files.pop(key, None)
+                self._hashes[key] = new_hash
+                self._dirty.add(key)
+                result = f"Successfully wrote to {file_path}"
+        if stale:
+            os.remove(stale)
+        return result
+
+    def _sweep(self, directory: str):
+        with self._lock:
+            if directory in self._swept:
+                return
+            self._swept.add(directory)
+        for path in sweep_temp_files(directory):
+            print(f"[Workspace] Removed {path}, left behind by an interrupted write.")
+
+    def flush(self) -> List[str]:
+        with self._lock:
+            pending = {key: self._files[key] for key in self._dirty if key in self._files}
+            staged = {key: self._staged[key] for key in self._dirty if key in self._staged}
+            self._dirty.clear()
+        failed = []
+        for key, content in sorted(pending.items()):
+            result = write_to_file(key, content)
+            if result.startswith("Error"):
+                print(f"[Workspace] {result}")
+                failed.append(key)
+        for key, tmp_path in sorted(staged.items()):
+            # Under the lock, so a reader never falls back to the old file between the rename and the bookkeeping.
+            with self._lock:
+                if self._staged.get(key) != tmp_path:
+                    continue
+                try:
+                    commit_write(tmp_path, key)
+                    del self._staged[key]
+                except OSError as e:
+                    print(f"[Workspace] Error writing to file '{key}': {e}")
+                    failed.append(key)
+        if failed:
+            with self._lock:
+                self._dirty.update(failed)
+        return sorted((set(pending) | set(staged)) - set(failed))
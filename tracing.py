@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def enable(self):
+        with self._lock:
+            self.enabled = True
+            self.spans = []
+            self._origin = time.perf_counter()
+            self._started_at = time.time()
+
+    @contextmanager
+    def span(self, name: str, category: str, **attrs):
+        # Yields the span's attribute dict so callers can attach results such as token counts.
+        if not self.enabled:
+            yield attrs
+            return
+        start = time.perf_counter()
+        try:
+            yield attrs
+        except BaseException as e:
+            attrs["error"] = repr(e)
+            raise
+        finally:
+            end = time.perf_counter()
+            thread = threading.current_thread()
+            record = {
+                "name": name,
+                "cat": category,
+                "ts": round((start - self._origin) * 1e6),
+                "dur": round((end - start) * 1e6),
+                "tid": thread.ident,
+                "thread": thread.name,
+                "args": attrs,
+            }
+            with self._lock:
+                self.spans.append(record)
+
+    def write_jsonl(self, path: str):
+        with open(path, "w") as f:
+            for record in self._snapshot():
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def write_chrome_trace(self, path: str):
+        # Loadable in chrome://tracing or https://ui.perfetto.dev.
+        pid = os.getpid()
+        spans = self._snapshot()
+        events = []
+        for tid, thread_name in sorted({(span["tid"], span["thread"]) for span in spans}):
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread_name}})
+        for span in spans:
+            events.append({
+                "name": span["name"],
+                "cat": span["cat"],
+                "ph": "X",
+                "ts": span["ts"],
+                "dur": span["dur"],
+                "pid": pid,
+                "tid": span["tid"],
+                "args": span["args"],
+            })
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+
+    def write(self, output_dir: str):
+        os.makedirs(output_dir, exist_ok=True)
+        self.write_jsonl(os.path.join(output_dir, "trace.jsonl"))
+        self.write_chrome_trace(os.path.join(output_dir, "trace.chrome.json"))
+        print(f"[Tracer] wrote {len(self.spans)} spans to {output_dir}")
+
+    def summary(self) -> str:
+        spans = self._snapshot()
+        rows: Dict[tuple, Dict[str, Any]] = {}
+        for span in spans:
+            row = rows.setdefault((span["cat"], span["name"]), {"count": 0, "total": 0, "max": 0, "prompt": 0, "cached": 0, "completion": 0})
+            row["count"] += 1
+            row["total"] += span["dur"]
+            row["max"] = max(row["max"], span["dur"])
+            row["prompt"] += span["args"].get("prompt_tokens") or 0
+            row["cached"] += span["args"].get("cached_tokens") or 0
+            row["completion"] += span["args"].get("completion_tokens") or 0
+
+        wall = max((span["ts"] + span["dur"] for span in spans), default=0)
+        header = f"{'category':<10} {'name':<34} {'count':>6} {'total s':>9} {'avg ms':>9} {'max ms':>9} {'prompt tok':>11} {'cached tok':>11} {'compl tok':>10}"
+        lines = [f"Run wall-clock time: {wall / 1e6:.2f}s (spans overlap when agents run concurrently)", header, "-" * len(header)]
+        for (category, name), row in sorted(rows.items(), key=lambda item: -item[1]["total"]):
+            lines.append(
+                f"{category:<10} {name[:34]:<34} {row['count']:>6} {row['total'] / 1e6:>9.2f} "
+                f"{row['total'] / row['count'] / 1e3:>9.1f} {row['max'] / 1e3:>9.1f} "
+                f"{row['prompt']:>11} {row['cached']:>11} {row['completion']:>10}"
+            )
+        prompt_tokens = sum(row["prompt"] for row in rows.values())
+        if prompt_tokens:
+            cached_tokens = sum(row["cached"] for row in rows.values())
+            lines.append(f"Prompt tokens served from the provider's prefix cache: {cached_tokens}/{prompt_tokens} ({cached_tokens / prompt_tokens:.0%})")
+        return "\n".join(lines)
+
+    def _snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self.spans)
+
+tracer = Tracer()
+
+def span(name: str, category: str, **attrs):
+    return tracer.span(name, category, **attrs)
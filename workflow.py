@@ -0,0 +1,102 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from agent_manager import AgentManager
+from agents.planner_agent import PlannerAgent
+from agents.coder_agent import CoderAgent
+from agents.evaluator_agent import EvaluatorAgent
+from agents.search_agent import SearchAgent
+from services import Services
+from tools.file_tools import safe_name
+
+def build_manager(checkpoint_path: Optional[str] = None, output_dir: Optional[str] = None, max_llm_calls: int = 100, services: Optional[Services] = None) -> Tuple[AgentManager, PlannerAgent]:
+    manager = AgentManager(max_llm_calls=max_llm_calls, services=services)
+    planner = PlannerAgent(checkpoint_path=checkpoint_path, output_dir=output_dir)
+    manager.add_agent(planner)
+    manager.add_agent(CoderAgent())
+    manager.add_agent(EvaluatorAgent())
+    manager.add_agent(SearchAgent())
+    return manager, planner
+
+def load_goals(path: str) -> List[Dict[str, Any]]:
+    # One JSON object per line with a "goal" (or "body") and an optional "id" (or "goal_id"/"request_id").
+    goals = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                print(f"[Batch] Skipping line {line_number} of {path}: {e}")
+                continue
+            goal = record.get("goal") or record.get("body")
+            if not goal:
+                print(f"[Batch] Skipping line {line_number} of {path}: no 'goal'.")
+                continue
+            goal_id = str(record.get("id") or record.get("goal_id") or record.get("request_id") or f"goal-{line_number}")
+            goals.append({"id": goal_id, "goal": goal, "max_llm_calls": record.get("max_llm_calls")})
+    return goals
+
+class BatchRunner:
+    # Runs many goals at once. Each goal gets its own agents, output directory, checkpoint and LLM call
+    # budget; the LLM router (and its rate limiter) is shared, so the provider sees one global limit.
+    def __init__(self, output_root: str = "output/batch", report_path: str = "output/batch/report.jsonl", max_parallel_goals: int = 4, max_llm_calls: int = 100, checkpoint_dir: str = ".checkpoints/batch"):
+        self.output_root = output_root
+        self.report_path = report_path
+        self.max_parallel_goals = max(1, max_parallel_goals)
+        self.max_llm_calls = max_llm_calls
+        self.checkpoint_dir = checkpoint_dir
+        self._report_lock = threading.Lock()
+
+    def run(self, goals: List[Dict[str, Any]], resume: bool = False) -> List[Dict[str, Any]]:
+        os.makedirs(os.path.dirname(self.report_path) or ".", exist_ok=True)
+        if not resume:
+            open(self.report_path, "w").close()
+        print(f"[Batch] Running {len(goals)} goals, {self.max_parallel_goals} at a time.")
+        with ThreadPoolExecutor(max_workers=self.max_parallel_goals, thread_name_prefix="run") as executor:
+            return list(executor.map(lambda goal: self._run_goal(goal, resume), goals))
+
+    def _run_goal(self, goal: Dict[str, Any], resume: bool) -> Dict[str, Any]:
+        name = safe_name(goal["id"], "goal")
+        output_dir = os.path.join(self.output_root, name)
+        checkpoint_path = os.path.join(self.checkpoint_dir, f"{name}.json")
+        result = {"id": goal["id"], "goal": goal["goal"], "output_dir": output_dir}
+        started = time.perf_counter()
+        try:
+            manager, planner = build_manager(checkpoint_path, output_dir, goal.get("max_llm_calls") or self.max_llm_calls)
+            if resume and os.path.exists(checkpoint_path):
+                manager.resume_task(planner.name)
+            else:
+                manager.start_task(goal["goal"], planner.name)
+            result.update(self._summarize(manager, planner, output_dir))
+        except Exception as e:
+            print(f"[Batch] Goal '{goal['id']}' failed: {e}")
+            result.update({"status": "error", "error": str(e)})
+        result["elapsed_s"] = round(time.perf_counter() - started, 2)
+        self._write_result(result)
+        print(f"[Batch] Goal '{goal['id']}' {result['status']} in {result['elapsed_s']}s.")
+        return result
+
+    def _summarize(self, manager: AgentManager, planner: PlannerAgent, output_dir: str) -> Dict[str, Any]:
+        verdicts: Dict[str, str] = {}
+        for entry in planner.evaluation_history:
+            if entry.get("file_path"):
+                verdicts[entry["file_path"]] = entry.get("status")
+        written = {os.path.join(root, name) for root, _, names in os.walk(output_dir) for name in names}
+        return {
+            "status": "finished" if planner.finished else "incomplete",
+            "files": [{"path": path, "exists": path in written, "verdict": verdicts.get(path)} for path in sorted(written | set(verdicts))],
+            "pending_tasks": len(planner.plan) + len(planner.running) + len(planner.failed),
+            "failed_tasks": sorted(planner.failed),
+            "llm_calls": manager.llm_budget.used,
+        }
+
+    def _write_result(self, result: Dict[str, Any]):
+        # Appended as each goal finishes, so a crashed batch still reports the goals it completed.
+        with self._report_lock:
+            with open(self.report_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")